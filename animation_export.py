@@ -0,0 +1,266 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.animation import FFMpegWriter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from animator import PlotAnimator
+from decimation import METHODS as DECIMATION_METHODS
+from fitting import AGGREGATIONS, smooth_curve
+from labels import LabelRenderer
+
+ANIMATION_EXTENSIONS = ('.gif', '.mp4')
+DEFAULT_FPS = 10
+# Frames are handed to the worker processes in batches of this many
+FRAMES_PER_TASK = 8
+
+# Everything a worker process needs to draw any frame. width and height are
+# in inches, as for render.
+AnimationSpec = namedtuple('AnimationSpec', ['x', 'y', 'smooth', 'curve', 'stride', 'method', 'x_label', 'y_label',
+                                             'title', 'latex', 'width', 'height', 'dpi'])
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def mp4_available():
+    return FFMpegWriter.isAvailable()
+
+
+def make_spec(x_values, y_values, smooth=False, stride=1, method='minmax', x_label='X', y_label='Y',
+              title="Line Plot", latex=False, width=6.4, height=4.8, dpi=100, duplicates='mean', curve=None):
+    # The curve is fitted once here, as start_animation does, instead of in
+    # every worker
+    if smooth and curve is None:
+        curve = smooth_curve(x_values, y_values, 'cubic', 300, duplicates)
+    return AnimationSpec(x_values, y_values, smooth, curve, stride, method, x_label, y_label, title, latex,
+                         width, height, dpi)
+
+
+# State of the frame renderer in a worker process, set up once per process
+_renderer = None
+
+
+class FrameRenderer:
+    # Draws frames of the animation off-screen on Agg the same way the
+    # window does: the axes, ticks and labels are drawn once and saved, and
+    # each frame restores them and draws only the animated artists.
+    def __init__(self, spec, encoding):
+        self.encoding = encoding
+        # Laid out tightly so the labels fit at whatever size is exported
+        self.figure = Figure(figsize=(spec.width, spec.height), dpi=spec.dpi, layout='tight')
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.animator = PlotAnimator(self.ax, spec.x, spec.y, smooth=spec.smooth, curve=spec.curve,
+                                     stride=spec.stride, method=spec.method)
+        LabelRenderer().apply(self.ax, spec.x_label, spec.y_label, spec.title, spec.latex)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def render(self, i):
+        self.canvas.restore_region(self.background)
+        for artist in self.animator.frame(i):
+            self.ax.draw_artist(artist)
+        rgb = np.asarray(self.canvas.buffer_rgba())[:, :, :3]
+        if self.encoding == 'gif':
+            # Reducing to a palette is the slow part of writing a GIF, so it
+            # is done here in parallel rather than by the parent
+            from PIL import Image
+            return Image.fromarray(rgb).quantize(method=Image.Quantize.FASTOCTREE)
+        return np.ascontiguousarray(rgb)
+
+
+def _init_worker(spec, encoding):
+    # Called with no spec to drop the renderer after an in-process export
+    global _renderer
+    _renderer = FrameRenderer(spec, encoding) if spec is not None else None
+
+
+def _render_frames(frames):
+    return [_renderer.render(i) for i in frames]
+
+
+class GifSink:
+    # Pillow writes a GIF in one go, so the palette frames are collected
+    def __init__(self, output, fps):
+        self.output = output
+        self.duration = 1000 / fps
+        self.frames = []
+
+    def add(self, frame):
+        self.frames.append(frame)
+
+    def close(self):
+        if self.frames:
+            self.frames[0].save(self.output, save_all=True, append_images=self.frames[1:],
+                                duration=self.duration, loop=0)
+        self.frames = []
+
+    def abort(self):
+        self.frames = []
+
+
+class Mp4Sink:
+    # Pipes raw RGB frames to ffmpeg as they arrive; ffmpeg is started on the
+    # first frame, once the frame size is known
+    def __init__(self, output, fps):
+        self.output = output
+        self.fps = fps
+        self.process = None
+
+    def add(self, frame):
+        if self.process is None:
+            height, width = frame.shape[:2]
+            # H.264 in yuv420p needs even dimensions
+            self.process = subprocess.Popen(
+                [FFMpegWriter.bin_path(), '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                 '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+                 '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', self.output],
+                stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.process.stdin.write(frame.tobytes())
+
+    def close(self):
+        if self.process is None:
+            return
+        self.process.stdin.close()
+        error = self.process.stderr.read().decode(errors='replace')
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {error.strip()}")
+
+    def abort(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            if os.path.exists(self.output):
+                os.remove(self.output)
+
+
+def export_animation(output, spec, fps=DEFAULT_FPS, jobs=None, progress=None, is_cancelled=None):
+    # Renders every frame of the animation across jobs worker processes and
+    # writes them to output as an animated GIF, or as MP4 when ffmpeg is
+    # installed. progress(frames done, total frames) is called as batches
+    # finish and is_cancelled() is polled between them. Returns the number
+    # of frames, seconds taken and size of the file.
+    start = time.perf_counter()
+    encoding = os.path.splitext(output)[1].lower().lstrip('.')
+    if '.' + encoding not in ANIMATION_EXTENSIONS:
+        raise ValueError(f"Animations can be exported as {', '.join(ANIMATION_EXTENSIONS)}")
+    if encoding == 'mp4' and not mp4_available():
+        raise ValueError("MP4 export needs ffmpeg; export as GIF instead")
+
+    num_frames = -(-len(spec.x) // max(int(spec.stride), 1))
+    batches = [range(i, min(i + FRAMES_PER_TASK, num_frames)) for i in range(0, num_frames, FRAMES_PER_TASK)]
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(batches)))
+    frame_sink = GifSink(output, fps) if encoding == 'gif' else Mp4Sink(output, fps)
+    done = 0
+    try:
+        if jobs == 1:
+            _init_worker(spec, encoding)
+            results = map(_render_frames, batches)
+            pool = None
+        else:
+            # Spawned rather than forked, since the GUI process has threads
+            pool = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(spec, encoding))
+            results = pool.map(_render_frames, batches)
+        try:
+            for frames in results:
+                if is_cancelled and is_cancelled():
+                    raise ExportCancelled()
+                for frame in frames:
+                    frame_sink.add(frame)
+                done += len(frames)
+                if progress:
+                    progress(done, num_frames)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            else:
+                _init_worker(None, None)
+        frame_sink.close()
+    except BaseException:
+        frame_sink.abort()
+        raise
+    return {'frames': num_frames, 'seconds': time.perf_counter() - start, 'bytes': os.path.getsize(output)}
+
+
+class AnimationExportWorker(QThread):
+    # Runs export_animation off the GUI thread. progress(frames done, total)
+    progress = pyqtSignal(int, int)
+    exported = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, output, spec, fps=DEFAULT_FPS, parent=None):
+        super().__init__(parent)
+        self.output = output
+        self.spec = spec
+        self.fps = fps
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def run(self):
+        try:
+            stats = export_animation(self.output, self.spec, self.fps, progress=self.progress.emit,
+                                     is_cancelled=self.is_cancelled)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.exported.emit(stats)
+
+
+def main(argv=None):
+    from render import read_input
+
+    parser = argparse.ArgumentParser(prog='main.py animate',
+                                     description="Export the plot animation of a file to GIF or MP4 without the GUI.")
+    parser.add_argument('--input', required=True, help="CSV/XLSX file; the first Y column is animated")
+    parser.add_argument('--out', required=True, help="Output file ending in .gif or .mp4")
+    parser.add_argument('--sheet', help="Sheet to read from XLSX files (the first by default)")
+    parser.add_argument('--smooth', action='store_true', help="Draw a smooth curve through the revealed points")
+    parser.add_argument('--duplicates', choices=AGGREGATIONS, default='mean',
+                        help="How repeated x-values are combined for the smooth curve")
+    parser.add_argument('--stride', type=int, default=1, help="Points revealed per frame")
+    parser.add_argument('--fps', type=float, default=DEFAULT_FPS)
+    parser.add_argument('--title', default="Line Plot")
+    parser.add_argument('--xlabel', default='')
+    parser.add_argument('--ylabel', default='')
+    parser.add_argument('--latex', action='store_true')
+    parser.add_argument('--decimation', choices=list(DECIMATION_METHODS), default="Min/Max")
+    parser.add_argument('--width', type=float, default=6.4, help="Figure width in inches")
+    parser.add_argument('--height', type=float, default=4.8, help="Figure height in inches")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="Worker processes")
+    args = parser.parse_args(argv)
+
+    try:
+        x_values, ys, preview, has_headers = read_input(args.input, args.sheet)
+        valid = np.isfinite(ys[:, 0])
+        spec = make_spec(x_values[valid], ys[valid, 0], args.smooth, args.stride, DECIMATION_METHODS[args.decimation],
+                         args.xlabel or (str(preview[0][0]) if has_headers else 'X'),
+                         args.ylabel or (str(preview[0][1]) if has_headers else 'Y'),
+                         args.title, args.latex, args.width, args.height, args.dpi, args.duplicates)
+        stats = export_animation(args.out, spec, args.fps, args.jobs,
+                                 progress=lambda done, total: print(f"\rFrame {done}/{total}", end='', flush=True))
+    except Exception as e:
+        print(f"Export failed: {e}")
+        return 1
+    print(f"\nWrote {stats['frames']} frames to {args.out} ({stats['bytes'] / 1e6:.1f} MB) "
+          f"in {stats['seconds']:.2f}s")
+    return 0
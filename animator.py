@@ -0,0 +1,104 @@
+import numpy as np
+
+from decimation import decimate
+from profiling import profiler
+
+
+class PlotAnimator:
+    # Reveals a snapshot of the data a few points per frame. The artists are
+    # created once and updated with set_data, and the animation is blitted so
+    # the axes, ticks and labels are only drawn when it starts.
+    def __init__(self, ax, x_values, y_values, smooth=False, curve=None, stride=1, method='minmax'):
+        self.ax = ax
+        self.x = x_values
+        self.y = y_values
+        self.stride = max(int(stride), 1)
+        self.method = method
+        self.animation = None
+        self.frame_number = 0
+        self.background = None
+        self._draw_id = None
+
+        # Number of distinct x-values in each prefix of the (sorted) data
+        self.unique_counts = np.cumsum(np.r_[1, np.diff(self.x) != 0]) if len(self.x) else np.empty(0)
+
+        # The curve through the whole series is computed once by the caller;
+        # each frame shows the part of it up to the last revealed point
+        self.curve = curve
+        self.curve_line = None
+        if smooth:
+            self.curve_line, = ax.plot([], [], 'b-', animated=True)
+            self.points_line, = ax.plot([], [], 'bo', animated=True)
+        else:
+            self.points_line, = ax.plot([], [], 'bo-', animated=True)
+
+        # Precompute the limits so they never change while animating
+        ax.set_xlim(self.x[0], self.x[-1])
+        ax.set_ylim(self.y.min(), self.y.max())
+
+    @property
+    def artists(self):
+        return [line for line in (self.curve_line, self.points_line) if line is not None]
+
+    def num_frames(self):
+        return -(-len(self.x) // self.stride)
+
+    def max_points(self):
+        return max(int(self.ax.get_window_extent().width), 100)
+
+    def init(self):
+        for line in self.artists:
+            line.set_data([], [])
+        return self.artists
+
+    def frame(self, i):
+        end = min((i + 1) * self.stride, len(self.x))
+        if end < 2:
+            return self.init()
+
+        with profiler.stage('update artists'):
+            self.points_line.set_data(*decimate(self.x[:end], self.y[:end], self.max_points(), self.method))
+            if self.curve_line is not None:
+                if self.curve is not None and self.unique_counts[end - 1] > 3:
+                    curve_x, curve_y = self.curve
+                    cut = np.searchsorted(curve_x, self.x[end - 1], 'right')
+                    self.curve_line.set_data(curve_x[:cut], curve_y[:cut])
+                else:
+                    self.curve_line.set_data([], [])
+            return self.artists
+
+    def step(self):
+        # One frame of the window's animation, blitted through the canvas
+        # onto the saved background
+        with profiler.frame('animate'):
+            artists = self.frame(self.frame_number)
+            self.frame_number = (self.frame_number + 1) % self.num_frames()
+            if self.background is not None:
+                with profiler.stage('blit'):
+                    canvas = self.ax.figure.canvas
+                    canvas.restore_region(self.background)
+                    for artist in artists:
+                        self.ax.draw_artist(artist)
+                    canvas.blit(self.ax.bbox)
+
+    def save_background(self, event):
+        # Every full draw (the first one, a resize) leaves out the animated
+        # artists, so it is what the frames are blitted onto
+        self.background = event.canvas.copy_from_bbox(self.ax.bbox)
+
+    def start(self, interval):
+        canvas = self.ax.figure.canvas
+        self.frame_number = 0
+        self._draw_id = canvas.mpl_connect('draw_event', self.save_background)
+        self.animation = canvas.new_timer(interval=interval)
+        self.animation.add_callback(self.step)
+        self.animation.start()
+        return self.animation
+
+    def stop(self):
+        if self.animation is None:
+            return
+        self.animation.stop()
+        self.ax.figure.canvas.mpl_disconnect(self._draw_id)
+        self.animation = None
+        self.background = None
@@ -0,0 +1,238 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# Runs headless unless a platform was chosen explicitly
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from PyQt6.QtWidgets import QApplication, QFileDialog
+
+import importers
+from main import BestFitLineWindow, PlotterApp
+from plotting import INTERPOLATION_KINDS
+
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+SLIDER_VALUES = [100, 1000, 10000]
+MAX_XLSX_ROWS = 10 ** 5  # Writing larger workbooks takes longer than the benchmark itself
+
+
+def make_dataset(n, duplicates, seed=0):
+    # Sorted-ish noisy sine; with duplicates every x value repeats about 4 times
+    rng = np.random.default_rng(seed)
+    if duplicates:
+        x = rng.integers(0, max(n // 4, 2), n).astype(np.float64)
+    else:
+        x = np.sort(rng.uniform(0, 100, n))
+    y = np.sin(x / 5) + rng.normal(0, 0.1, n)
+    return x, y
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+class Benchmark:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, stage, n, duplicates, func, repeat=None, **params):
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = time_call(func, repeat or self.repeat)
+        result = {'stage': stage, 'n': n, 'duplicates': duplicates, 'params': params,
+                  'min': min(timings), 'median': statistics.median(timings), 'repeat': len(timings)}
+        self.results.append(result)
+        label = ', '.join(f'{key}={value}' for key, value in params.items())
+        print(f"{stage:<16} n={n:<9} dup={str(duplicates):<5} {label:<32} "
+              f"min {result['min'] * 1000:10.2f} ms  median {result['median'] * 1000:10.2f} ms")
+
+
+def bench_import(bench, tmp_dir, n, duplicates, x, y):
+    csv_path = os.path.join(tmp_dir, f'data_{n}_{duplicates}.csv')
+    pd.DataFrame({'x': x, 'y': y}).to_csv(csv_path, index=False)
+    bench.run('import_csv', n, duplicates, lambda: importers.load_csv(csv_path, 1))
+    os.remove(csv_path)
+    if n <= MAX_XLSX_ROWS:
+        xlsx_path = os.path.join(tmp_dir, f'data_{n}_{duplicates}.xlsx')
+        pd.DataFrame({'x': x, 'y': y}).to_excel(xlsx_path, index=False)
+        bench.run('import_xlsx', n, duplicates, lambda: importers.load_xlsx(xlsx_path, 1))
+        os.remove(xlsx_path)
+
+
+def bench_get_plot_data(bench, window, n, duplicates):
+    def get_plot_data():
+        window.dataset._changed()  # Drop the cached sort
+        window.get_plot_data()
+    bench.run('get_plot_data', n, duplicates, get_plot_data)
+
+
+def bench_plot_styles(bench, window, n, duplicates):
+    def plot():
+        window.fit_cache.clear()
+        window.plot_data()
+
+    window.style_dropdown.setCurrentText("Connecting Lines")
+    bench.run('plot_data', n, duplicates, plot, style="Connecting Lines")
+
+    window.style_dropdown.setCurrentText("Smooth Curve")
+    for kind in INTERPOLATION_KINDS:
+        window.interp_dropdown.setCurrentText(kind)
+        for value in SLIDER_VALUES:
+            window.points_slider.setValue(value)
+            bench.run('plot_data', n, duplicates, plot, style="Smooth Curve", kind=kind, points=value)
+
+    window.style_dropdown.setCurrentText("Polynomial Fit")
+    for degree in range(1, 11):
+        window.poly_degree_spinner.setValue(degree)
+        bench.run('plot_data', n, duplicates, plot, style="Polynomial Fit", degree=degree)
+
+
+def bench_animate(bench, window, n, duplicates):
+    for style in ("Connecting Lines", "Smooth Curve"):
+        window.style_dropdown.setCurrentText(style)
+        # About 50 frames whatever the size
+        window.stride_spinner.setValue(max(n // 50, 1))
+        window.start_animation()
+        frames = window.animator.num_frames()
+        canvas = window.canvas
+
+        frame_numbers = itertools.count()
+
+        def frame():
+            # One blitted frame: update the artists, draw them, blit
+            artists = window.animate(next(frame_numbers) % frames)
+            for artist in artists:
+                window.ax.draw_artist(artist)
+            canvas.blit(window.ax.bbox)
+
+        bench.run('animate', n, duplicates, frame, repeat=min(frames, 50), style=style)
+        window.stop_animation()
+
+
+def bench_best_fit(bench, window, n, duplicates, x, y):
+    dialog = BestFitLineWindow(window)
+    dialog.compute_in_background = False
+    dialog.table_model.set_arrays(x, y)
+
+    def find_best_fit():
+        dialog.fit_cache.clear()
+        dialog.find_best_fit()
+
+    dialog.degree_spinbox.setValue(3)
+    bench.run('find_best_fit', n, duplicates, find_best_fit, degree=3)
+    dialog.auto_degree_checkbox.setChecked(True)
+    bench.run('find_best_fit', n, duplicates, find_best_fit, degree='auto')
+    dialog.deleteLater()
+
+
+def bench_save_plot(bench, window, tmp_dir, n, duplicates):
+    window.style_dropdown.setCurrentText("Connecting Lines")
+    window.plot_data()
+    path = os.path.join(tmp_dir, 'plot.png')
+    original = QFileDialog.getSaveFileName
+    QFileDialog.getSaveFileName = staticmethod(lambda *args, **kwargs: (path, ''))
+    def save_plot():
+        # Timed until the file is written, not just until the export starts
+        window.save_plot()
+        window.plot_export_worker.wait()
+
+    try:
+        bench.run('save_plot', n, duplicates, save_plot)
+    finally:
+        QFileDialog.getSaveFileName = original
+
+
+def environment():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(result):
+        return result['stage'], result['n'], result['duplicates'], json.dumps(result['params'], sort_keys=True)
+
+    previous = {key(result): result for result in baseline['results']}
+    print(f"\nCompared with {baseline_path} ({baseline['environment']['timestamp']}):")
+    for result in results:
+        old = previous.get(key(result))
+        if old:
+            print(f"{result['stage']:<16} n={result['n']:<9} dup={str(result['duplicates']):<5} "
+                  f"{json.dumps(result['params']):<48} {old['median'] / result['median']:6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the plotting pipeline on synthetic data.")
+    parser.add_argument('--sizes', type=lambda text: [int(float(size)) for size in text.split(',')],
+                        default=DEFAULT_SIZES, help="Comma-separated dataset sizes, e.g. 1e3,1e5")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', default='import,get_plot_data,plot_data,animate,find_best_fit,save_plot',
+                        help="Comma-separated subset of stages to run")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+    stages = set(args.stages.split(','))
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = PlotterApp()
+    window.compute_in_background = False
+    window.resize(1000, 600)
+    window.show()
+    app.processEvents()
+    # Only the timed calls should plot, not the live refit on parameter changes
+    for widget in (window.style_dropdown, window.interp_dropdown, window.points_slider, window.poly_degree_spinner):
+        widget.blockSignals(True)
+
+    bench = Benchmark(args.repeat)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.sizes:
+            for duplicates in (False, True):
+                x, y = make_dataset(n, duplicates)
+                if 'import' in stages:
+                    bench_import(bench, tmp_dir, n, duplicates, x, y)
+                window.table_model.set_arrays(x, y)
+                if 'get_plot_data' in stages:
+                    bench_get_plot_data(bench, window, n, duplicates)
+                if 'plot_data' in stages:
+                    bench_plot_styles(bench, window, n, duplicates)
+                if 'animate' in stages:
+                    bench_animate(bench, window, n, duplicates)
+                if 'find_best_fit' in stages:
+                    bench_best_fit(bench, window, n, duplicates, x, y)
+                if 'save_plot' in stages:
+                    bench_save_plot(bench, window, tmp_dir, n, duplicates)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': bench.results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(bench.results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from fitting import data_fingerprint
+
+
+class Dataset:
+    # Columnar storage for the plotted data: a float64 x array shared by one
+    # or more y series (an n x k array). Empty or invalid cells are stored as
+    # NaN so rows can be added before they are filled in.
+    def __init__(self, x=None, y=None, series_names=None):
+        self._x = np.empty(0, dtype=np.float64)
+        self._ys = np.empty((0, 1), dtype=np.float64)
+        self._size = 0
+        self.series_names = ['Y']
+        self.version = 0
+        self._sorted_cache = None
+        self._series_cache = None
+        self._fingerprint = None
+        if x is not None and y is not None:
+            self.set_arrays(x, y, series_names)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def num_series(self):
+        return self._ys.shape[1]
+
+    @property
+    def x(self):
+        return self._x[:self._size]
+
+    @property
+    def ys(self):
+        return self._ys[:self._size]
+
+    @property
+    def y(self):
+        return self._ys[:self._size, 0]
+
+    @property
+    def valid(self):
+        # Rows where x and the first series are present
+        return np.isfinite(self.x) & np.isfinite(self.y)
+
+    def _changed(self):
+        self.version += 1
+        self._sorted_cache = None
+        self._series_cache = None
+        self._fingerprint = None
+
+    def set_arrays(self, x, y, series_names=None, copy=True):
+        # copy=False keeps float64 arrays as given, e.g. memory-mapped ones
+        x = np.asarray(x, dtype=np.float64)
+        ys = np.asarray(y, dtype=np.float64)
+        if ys.ndim == 1:
+            ys = ys[:, np.newaxis]
+        if x.ndim != 1 or ys.ndim != 2 or len(x) != len(ys):
+            raise ValueError("x must be one-dimensional with one row of y values per x value")
+        if series_names is None:
+            series_names = ['Y'] if ys.shape[1] == 1 else [f'Y{i + 1}' for i in range(ys.shape[1])]
+        if len(series_names) != ys.shape[1]:
+            raise ValueError("series_names must have one name per y column")
+        self._x = x.copy() if copy else x
+        self._ys = ys.copy() if copy else ys
+        self._size = len(x)
+        self.series_names = list(series_names)
+        self._changed()
+
+    def clear(self):
+        self.set_arrays([], [])
+
+    def append_rows(self, count=1):
+        # Grow the backing arrays geometrically so repeated 'Add Row' clicks
+        # stay amortised O(1).
+        new_size = self._size + count
+        if new_size > len(self._x):
+            capacity = max(new_size, 2 * len(self._x), 16)
+            grown_x = np.full(capacity, np.nan)
+            grown_x[:self._size] = self.x
+            grown_ys = np.full((capacity, self.num_series), np.nan)
+            grown_ys[:self._size] = self.ys
+            self._x, self._ys = grown_x, grown_ys
+        self._x[self._size:new_size] = np.nan
+        self._ys[self._size:new_size] = np.nan
+        self._size = new_size
+        self._changed()
+
+    def value(self, row, column):
+        return self._x[row] if column == 0 else self._ys[row, column - 1]
+
+    def set_value(self, row, column, value):
+        # Sorted views handed out earlier must not change under their users
+        if self._series_cache is not None and np.may_share_memory(self._series_cache[0], self._x):
+            self._x, self._ys = self._x.copy(), self._ys.copy()
+        if column == 0:
+            self._x[row] = value
+        else:
+            self._ys[row, column - 1] = value
+        self._changed()
+
+    def valid_arrays(self):
+        mask = self.valid
+        return self.x[mask], self.y[mask]
+
+    def sorted_arrays(self):
+        # Valid points of the first series ordered by x, keeping duplicates
+        # in their original order. The result is cached until the data changes.
+        if self._sorted_cache is None:
+            if self.num_series == 1:
+                # Same rows as sorted_series, which may already be cached
+                x, ys = self.sorted_series()
+                self._sorted_cache = (x, ys[:, 0])
+            else:
+                x, y = self.valid_arrays()
+                order = np.argsort(x, kind='stable')
+                self._sorted_cache = (x[order], y[order])
+        return self._sorted_cache
+
+    def sort_order(self):
+        # Indices of the rows where x and at least one series are present, in x order
+        rows = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.ys).any(axis=1))
+        return rows[np.argsort(self.x[rows], kind='stable')]
+
+    def sorted_series(self):
+        # Rows where x and at least one series are present, ordered by x, as
+        # (x, ys). A series missing from some of those rows keeps NaN there,
+        # so one sparse series does not cost the others their rows.
+        if self._series_cache is None:
+            order = self.sort_order()
+            if len(order) == len(self) and np.all(order[1:] > order[:-1]):
+                # Already in order with nothing missing, so views will do
+                self._series_cache = (self.x, self.ys)
+            else:
+                self._series_cache = (self.x[order], self.ys[order])
+        return self._series_cache
+
+    def fingerprint(self):
+        # Hash of the sorted valid data, used to key cached fits
+        if self._fingerprint is None:
+            self._fingerprint = data_fingerprint(*self.sorted_series())
+        return self._fingerprint
+
+    def restore_caches(self, order=None, fingerprint=None):
+        # Fill in what a saved project already knows instead of sorting and
+        # hashing the data again. Without order the data is sorted as usual.
+        if order is not None:
+            self._series_cache = (self.x[order], self.ys[order])
+        self._fingerprint = fingerprint
+
+
+class DataTableModel(QAbstractTableModel):
+    def __init__(self, dataset, parent=None):
+        super().__init__(parent)
+        self.dataset = dataset
+
+    @property
+    def headers(self):
+        return ['X'] + self.dataset.series_names
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.dataset)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        value = self.dataset.value(index.row(), index.column())
+        if np.isnan(value):
+            return ''
+        if role == Qt.ItemDataRole.EditRole:
+            # Full precision, so opening a cell to edit it does not round the value
+            return repr(float(value))
+        return f'{value:.10g}'
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        text = str(value).strip()
+        if text:
+            try:
+                number = float(text)
+            except ValueError:
+                print(f"Invalid data in row {index.row() + 1}")
+                return False
+        else:
+            number = np.nan
+        self.dataset.set_value(index.row(), index.column(), number)
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def add_row(self):
+        row = len(self.dataset)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.dataset.append_rows(1)
+        self.endInsertRows()
+
+    def set_arrays(self, x, y, series_names=None, copy=True):
+        self.beginResetModel()
+        self.dataset.set_arrays(x, y, series_names, copy)
+        self.endResetModel()
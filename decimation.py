@@ -0,0 +1,148 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+
+from profiling import profiler
+
+METHODS = {"Min/Max": "minmax", "LTTB": "lttb", "Off": None}
+
+
+def minmax_indices(y, n_buckets):
+    # Split the series into equal-count buckets and keep the smallest and
+    # largest sample of each, so peaks survive at any zoom level.
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.empty(n_buckets * size)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    blocks = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lo = blocks.argmin(axis=1) + offsets
+    hi = blocks.argmax(axis=1) + offsets
+    indices = np.unique(np.concatenate(([0, n - 1], lo, hi)))
+    return indices[indices < n]
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: pick the point in each bucket forming
+    # the largest triangle with the previous pick and the next bucket mean.
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        if i + 2 < len(edges):
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def decimate(x, y, max_points, method='minmax'):
+    if method is None or len(x) <= max_points:
+        return x, y
+    with profiler.stage('decimate'):
+        if method == 'lttb':
+            indices = lttb_indices(x, y, max_points)
+        else:
+            indices = minmax_indices(y, max(max_points // 2, 1))
+        return x[indices], y[indices]
+
+
+class LevelOfDetail:
+    # Keeps the full-resolution arrays of each line or collection and only
+    # hands matplotlib about one point per horizontal pixel of the visible
+    # x-range. The axes must be re-wrapped after ax.clear(), which drops its
+    # callbacks.
+    def __init__(self, ax, method='minmax'):
+        self.ax = ax
+        self.method = method
+        self.lines = []
+        self.collections = []
+        self._last_range = None
+        self._callback_id = ax.callbacks.connect('xlim_changed', self.refine)
+
+    def detach(self):
+        # Stop refining, e.g. for a one-off render where the view never changes
+        self.ax.callbacks.disconnect(self._callback_id)
+
+    def max_points(self):
+        return max(int(self.ax.get_window_extent().width), 100)
+
+    def visible(self, x, y, x_range, max_points):
+        if x_range is not None:
+            # One extra point on each side keeps the segments crossing the
+            # edges of the view
+            start = max(np.searchsorted(x, x_range[0], 'left') - 1, 0)
+            end = min(np.searchsorted(x, x_range[1], 'right') + 1, len(x))
+            x, y = x[start:end], y[start:end]
+        return decimate(x, y, max_points, self.method)
+
+    def plot(self, x, y, *args, **kwargs):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        x_dec, y_dec = decimate(x, y, self.max_points(), self.method)
+        line, = self.ax.plot(x_dec, y_dec, *args, **kwargs)
+        if len(x) > len(x_dec):
+            self.lines.append((line, x, y))
+        return line
+
+    def line_segments(self, series, x_range=None):
+        max_points = self.max_points()
+        return [np.column_stack(self.visible(x, y, x_range, max_points)) for x, y in series]
+
+    def marker_points(self, series, colors, x_range=None):
+        segments = self.line_segments(series, x_range)
+        counts = [len(segment) for segment in segments]
+        offsets = np.concatenate(segments) if segments else np.empty((0, 2))
+        return offsets, np.repeat(to_rgba_array(colors), counts, axis=0)
+
+    def add_lines(self, series, colors, **kwargs):
+        # A single LineCollection draws any number of (x, y) series
+        collection = LineCollection(self.line_segments(series), colors=colors, **kwargs)
+        self.ax.add_collection(collection)
+        self.ax.autoscale_view()
+        self.collections.append((collection, series, None))
+        return collection
+
+    def add_markers(self, series, colors, **kwargs):
+        # A single PathCollection holds the markers of every series
+        offsets, facecolors = self.marker_points(series, colors)
+        collection = self.ax.scatter(offsets[:, 0], offsets[:, 1], c=facecolors, **kwargs)
+        self.collections.append((collection, series, colors))
+        return collection
+
+    def refine(self, ax=None, scale=1):
+        # scale > 1 keeps more points than the screen needs, for exporting
+        # at a higher resolution
+        if not self.lines and not self.collections:
+            return
+        x_min, x_max = sorted(self.ax.get_xlim())
+        max_points = int(self.max_points() * scale)
+        if (x_min, x_max, max_points) == self._last_range:
+            return
+        self._last_range = (x_min, x_max, max_points)
+        for line, x, y in self.lines:
+            line.set_data(*self.visible(x, y, (x_min, x_max), max_points))
+        for collection, series, colors in self.collections:
+            if colors is None:
+                collection.set_segments(self.line_segments(series, (x_min, x_max)))
+            else:
+                offsets, facecolors = self.marker_points(series, colors, (x_min, x_max))
+                collection.set_offsets(offsets)
+                collection.set_facecolors(facecolors)
+        self.ax.figure.canvas.draw_idle()
@@ -0,0 +1,396 @@
+import hashlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from profiling import profiler
+
+PolynomialFit = namedtuple('PolynomialFit', ['coeffs', 'x_new', 'y_new', 'r_squared'])
+Aggregated = namedtuple('Aggregated', ['x', 'y', 'counts'])
+DegreeScan = namedtuple('DegreeScan', ['degrees', 'r_squared', 'adjusted_r_squared', 'aic', 'cv_rmse', 'fits'])
+
+# Degree selection criteria: DegreeScan field and whether higher is better
+CRITERIA = {
+    "Adjusted R²": ('adjusted_r_squared', True),
+    "AIC": ('aic', False),
+    "LOOCV RMSE": ('cv_rmse', False),
+}
+
+# Ways of combining the y-values of repeated x-values before smoothing
+AGGREGATIONS = ["mean", "median", "min", "max"]
+
+# Interpolation kinds need more than this many distinct x-values
+MIN_UNIQUE = {"quadratic": 2, "cubic": 3}
+
+SAVGOL_ORDER = 3
+SAVGOL_WINDOW = 0.05  # Fraction of the grid
+LOWESS_FRACTION = 0.1  # Fraction of the bins in each local fit
+
+
+def count_unique(x_values):
+    # x_values must be sorted
+    return 1 + int(np.count_nonzero(np.diff(x_values))) if len(x_values) else 0
+
+
+def aggregate_duplicates(x_values, y_values, how='mean'):
+    # Collapses runs of equal x-values into one point each, using the group
+    # boundaries of the (sorted) x_values rather than a Python set. y_values
+    # may be an n x k array; each series is aggregated separately.
+    y_values = np.asarray(y_values, dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, x_values[1:] != x_values[:-1]])
+    counts = np.diff(np.r_[starts, len(x_values)])
+    if how == 'mean':
+        y = np.add.reduceat(y_values, starts, axis=0) / (counts if y_values.ndim == 1 else counts[:, None])
+    elif how == 'min':
+        y = np.minimum.reduceat(y_values, starts, axis=0)
+    elif how == 'max':
+        y = np.maximum.reduceat(y_values, starts, axis=0)
+    elif how == 'median':
+        # Sort the values within each group, then average the middle pair. A
+        # single argsort on group index + value scaled into [0, 1) is much
+        # faster than lexsort; values closer than about span * 2**-(52 -
+        # log2(groups)) may swap, which moves the median by no more than that.
+        groups = np.repeat(np.arange(len(starts)), counts)
+        lower, upper = starts + (counts - 1) // 2, starts + counts // 2
+        medians = []
+        for column in y_values.reshape(len(x_values), -1).T:
+            span = np.ptp(column) * (1 + 1e-9) or 1.0
+            ordered = column[np.argsort(groups + (column - column.min()) / span)]
+            medians.append((ordered[lower] + ordered[upper]) / 2)
+        y = medians[0] if y_values.ndim == 1 else np.column_stack(medians)
+    else:
+        raise ValueError(f"Unknown aggregation: {how}")
+    return Aggregated(x_values[starts], y, counts)
+
+
+def binned_means(x_values, y_values, num_bins, weights=None):
+    # Weighted mean of x and y in each non-empty one of num_bins equal-width
+    # bins over the x-range. x_values must be sorted, so the bins come out
+    # in order. Returns the bin x, bin y (n x k if y_values is) and weights.
+    weights = np.ones(len(x_values)) if weights is None else np.asarray(weights, dtype=np.float64)
+    span = x_values[-1] - x_values[0]
+    bins = np.minimum(((x_values - x_values[0]) * (num_bins / span)).astype(np.intp), num_bins - 1)
+    total = np.bincount(bins, weights, num_bins)
+    filled = total > 0
+    total = total[filled]
+    bin_x = np.bincount(bins, weights * x_values, num_bins)[filled] / total
+    columns = [np.bincount(bins, weights * column, num_bins)[filled] / total
+               for column in np.reshape(y_values, (len(x_values), -1)).T]
+    return bin_x, columns[0] if np.ndim(y_values) == 1 else np.column_stack(columns), total
+
+
+def binned_mean_curve(x_values, y_values, num_points, weights=None):
+    bin_x, bin_y, _ = binned_means(x_values, y_values, num_points, weights)
+    return bin_x, bin_y
+
+
+def savgol_curve(x_values, y_values, num_points, weights=None):
+    # Bin means resampled onto a uniform grid of num_points (empty bins are
+    # filled in linearly), then a Savitzky-Golay filter over the grid
+    from scipy.signal import savgol_filter
+
+    bin_x, bin_y, _ = binned_means(x_values, y_values, num_points, weights)
+    x_new = np.linspace(x_values[0], x_values[-1], num_points)
+    grid = np.column_stack([np.interp(x_new, bin_x, column) for column in np.reshape(bin_y, (len(bin_x), -1)).T])
+    window = max(int(num_points * SAVGOL_WINDOW) // 2 * 2 + 1, SAVGOL_ORDER + 2)
+    y_new = savgol_filter(grid, window, SAVGOL_ORDER, axis=0)
+    return x_new, y_new[:, 0] if np.ndim(y_values) == 1 else y_new
+
+
+def lowess_curve(x_values, y_values, num_points, weights=None):
+    # Locally weighted linear regression with tricube weights, evaluated at
+    # num_points. It runs on the bin means (weighted by their point counts)
+    # over a window of a fixed number of bins, so the cost does not depend on
+    # the number of points beyond the binning pass. There are no robustness
+    # iterations.
+    bin_x, bin_y, bin_weights = binned_means(x_values, y_values, num_points, weights)
+    bin_y = np.reshape(bin_y, (len(bin_x), -1))
+    x_new = np.linspace(x_values[0], x_values[-1], num_points)
+    size = min(max(int(len(bin_x) * LOWESS_FRACTION), 3), len(bin_x))
+    first = np.clip(np.searchsorted(bin_x, x_new) - size // 2, 0, len(bin_x) - size)
+    y_new = np.empty((num_points, bin_y.shape[1]))
+    block = max(1_000_000 // size, 1)  # Evaluation points per block, to bound memory
+    for start in range(0, num_points, block):
+        window = first[start:start + block, None] + np.arange(size)
+        u = bin_x[window] - x_new[start:start + block, None]
+        distance = np.abs(u)
+        scale = distance.max(axis=1, keepdims=True) * (1 + 1e-9)
+        scale[scale == 0] = 1
+        w = (1 - (distance / scale) ** 3) ** 3 * bin_weights[window]
+        s0, s1, s2 = w.sum(axis=1), (w * u).sum(axis=1), (w * u * u).sum(axis=1)
+        determinant = s0 * s2 - s1 * s1
+        for j in range(bin_y.shape[1]):
+            y = bin_y[window, j]
+            t0, t1 = (w * y).sum(axis=1), (w * u * y).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Intercept of the local line at u = 0; a weighted mean where the line is undetermined
+                y_new[start:start + block, j] = np.where(np.abs(determinant) > 1e-12 * s0 * s2,
+                                                         (s2 * t0 - s1 * t1) / determinant, t0 / s0)
+    return x_new, y_new[:, 0] if np.ndim(y_values) == 1 else y_new
+
+
+# Smoothing methods offered next to the interpolation kinds. They take
+# (x, y, num_points, weights) and scale linearly with the number of points.
+SMOOTHERS = {
+    "binned mean": binned_mean_curve,
+    "savitzky-golay": savgol_curve,
+    "lowess": lowess_curve,
+}
+
+
+def smooth_curve(x_values, y_values, kind, num_points, duplicates='mean'):
+    # Returns the smoothed or interpolated curve, or None when there are too
+    # few distinct x-values for kind and the caller should fall back to a
+    # simple line. y_values may be an n x k array to smooth k series sharing
+    # x in one call. Repeated x-values are first collapsed with the
+    # duplicates aggregation; the smoothers weight each by its count.
+    unique = count_unique(x_values)
+    if unique <= MIN_UNIQUE.get(kind, 1):
+        return None
+    counts = None
+    if unique < len(x_values):
+        with profiler.stage('aggregate'):
+            x_values, y_values, counts = aggregate_duplicates(x_values, y_values, duplicates)
+    if kind in SMOOTHERS:
+        with profiler.stage(kind):
+            return SMOOTHERS[kind](x_values, y_values, num_points, counts)
+
+    # scipy is only imported the first time a curve is interpolated
+    from scipy import interpolate
+
+    x_new = np.linspace(x_values[0], x_values[-1], num_points)
+    with profiler.stage('interp1d'):
+        f = interpolate.interp1d(x_values, y_values, kind=kind, axis=0)
+    with profiler.stage('evaluate'):
+        return x_new, f(x_new)
+
+
+def r_squared(y_values, y_pred):
+    # Per column when y_values is an n x k array
+    return 1 - (np.sum((y_values - y_pred) ** 2, axis=0) / np.sum((y_values - np.mean(y_values, axis=0)) ** 2, axis=0))
+
+
+def polynomial_fit(x_values, y_values, degree, num_points=100):
+    # np.polyfit fits every column of a 2-D y_values against the same x in a
+    # single least-squares solve; coeffs then has one column per series.
+    with profiler.stage('polyfit'):
+        coeffs = np.polyfit(x_values, y_values, degree)
+    with profiler.stage('evaluate'):
+        x_new = np.linspace(np.min(x_values), np.max(x_values), num_points)
+        y_new = np.vander(x_new, degree + 1) @ coeffs
+        y_pred = np.vander(x_values, degree + 1) @ coeffs
+        return PolynomialFit(coeffs, x_new, y_new, r_squared(y_values, y_pred))
+
+
+def polynomial_degree_scan(x_values, y_values, max_degree=10, num_points=100):
+    # Fits every degree from 1 to max_degree from a single QR factorization.
+    # The basis is Legendre polynomials on x mapped to [-1, 1], which keeps
+    # the factorization well conditioned at high degree and large n. Because
+    # the columns are nested, the first d + 1 columns of Q span the degree-d
+    # fit, so each extra degree only costs one more column of residual and
+    # leverage updates.
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+    n = len(x_values)
+    max_degree = min(max_degree, len(np.unique(x_values)) - 1, n - 2)
+    if max_degree < 1:
+        raise ValueError("Not enough distinct points to fit a polynomial")
+
+    domain = [x_values.min(), x_values.max()]
+    t = np.polynomial.polyutils.mapdomain(x_values, domain, [-1, 1])
+    with profiler.stage('qr'):
+        q, r = np.linalg.qr(np.polynomial.legendre.legvander(t, max_degree))
+        qty = q.T @ y_values
+
+    total = np.sum((y_values - y_values.mean()) ** 2)
+    residuals = y_values - q[:, 0] * qty[0]
+    leverage = q[:, 0] ** 2
+    x_new = np.linspace(domain[0], domain[1], num_points)
+
+    degrees, r2, adjusted, aic, cv_rmse, fits = [], [], [], [], [], []
+    for degree in range(1, max_degree + 1):
+        residuals -= q[:, degree] * qty[degree]
+        leverage += q[:, degree] ** 2
+        rss = np.sum(residuals ** 2)
+        k = degree + 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = 1 - rss / total
+            loo = residuals / (1 - leverage)
+        degrees.append(degree)
+        r2.append(score)
+        adjusted.append(1 - (1 - score) * (n - 1) / (n - k))
+        aic.append(n * np.log(max(rss, np.finfo(float).tiny) / n) + 2 * k)
+        cv_rmse.append(np.sqrt(np.mean(loo ** 2)))
+
+        coef = np.linalg.solve(r[:k, :k], qty[:k])
+        legendre = np.polynomial.Legendre(coef, domain=domain)
+        coeffs = legendre.convert(kind=np.polynomial.Polynomial).coef[::-1]
+        fits.append(PolynomialFit(coeffs, x_new, legendre(x_new), score))
+
+    return DegreeScan(degrees, np.array(r2), np.array(adjusted), np.array(aic), np.array(cv_rmse), fits)
+
+
+class StreamingPolynomialFit:
+    # Least-squares polynomial fit over data that arrives in chunks, using
+    # memory independent of the number of points. Only the triangular factor
+    # R of the QR decomposition of [V | y] is kept, where V holds the powers
+    # of x scaled to about [-1, 1]; each chunk is folded in with one small QR
+    # of R stacked on the chunk's rows. The last diagonal entry of R is the
+    # root of the residual sum of squares, and a running mean and sum of
+    # squared deviations of y give R². When a chunk reaches outside the
+    # scaled range, R is rewritten in a wider basis, so one pass is enough.
+    def __init__(self, degree):
+        self.degree = degree
+        self.count = 0
+        self.center = 0.0
+        self.half_width = None
+        self.x_min = np.inf
+        self.x_max = -np.inf
+        self.mean = 0.0
+        self.sum_squares = 0.0
+        self._r = np.zeros((0, degree + 2))
+
+    def add(self, x_values, y_values):
+        x_values = np.asarray(x_values, dtype=np.float64)
+        y_values = np.asarray(y_values, dtype=np.float64)
+        valid = np.isfinite(x_values) & np.isfinite(y_values)
+        x_values, y_values = x_values[valid], y_values[valid]
+        if len(x_values) == 0:
+            return
+        low, high = x_values.min(), x_values.max()
+        self.x_min, self.x_max = min(self.x_min, low), max(self.x_max, high)
+        if self.half_width is None:
+            self.center, self.half_width = (high + low) / 2, max((high - low) / 2, abs(high) * 1e-9, 1e-300)
+        elif low < self.center - self.half_width or high > self.center + self.half_width:
+            self._widen(low, high)
+
+        t = (x_values - self.center) / self.half_width
+        rows = np.column_stack([np.vander(t, self.degree + 1, increasing=True), y_values])
+        self._r = np.linalg.qr(np.vstack([self._r, rows]), mode='r')
+
+        # Chan et al.'s update of the mean and sum of squared deviations
+        n = len(y_values)
+        chunk_mean = y_values.mean()
+        delta = chunk_mean - self.mean
+        total = self.count + n
+        self.sum_squares += np.sum((y_values - chunk_mean) ** 2) + delta ** 2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+    def _widen(self, low, high):
+        # The new range covers the old one and twice the growth beyond it, so
+        # data that keeps extending the range (a time axis) needs few rewrites.
+        # With t' = a t + b, the old columns are V = V' N, N holding the
+        # powers of (b + a t), and R' comes from the QR of R N.
+        old_low, old_high = self.center - self.half_width, self.center + self.half_width
+        new_low = min(low, old_low) - (old_low - low if low < old_low else 0)
+        new_high = max(high, old_high) + (high - old_high if high > old_high else 0)
+        center, half_width = (new_high + new_low) / 2, (new_high - new_low) / 2
+        a, b = self.half_width / half_width, (self.center - center) / half_width
+        k = self.degree + 1
+        n = np.zeros((k + 1, k + 1))
+        for i in range(k):
+            n[:i + 1, i] = np.polynomial.polynomial.polypow([b, a], i)
+        n[k, k] = 1
+        if len(self._r):
+            self._r = np.linalg.qr(self._r @ n, mode='r')
+        self.center, self.half_width = center, half_width
+
+    def polynomial(self):
+        # The fitted polynomial in the scaled variable, as a numpy Polynomial
+        # that takes x directly
+        k = self.degree + 1
+        if self.count < k or len(self._r) < k:
+            raise ValueError("Not enough points to fit a polynomial of this degree")
+        coef = np.linalg.lstsq(self._r[:k, :k], self._r[:k, k], rcond=None)[0]
+        domain = [self.center - self.half_width, self.center + self.half_width]
+        return np.polynomial.Polynomial(coef, domain=domain, window=[-1, 1])
+
+    def residual_sum_of_squares(self):
+        k = self.degree + 1
+        return float(self._r[k, k] ** 2) if len(self._r) > k else 0.0
+
+    def statistics(self):
+        rss = self.residual_sum_of_squares()
+        k = self.degree + 1
+        return {
+            'points': self.count,
+            'r_squared': 1 - rss / self.sum_squares if self.sum_squares > 0 else np.nan,
+            'rmse': np.sqrt(rss / self.count) if self.count else np.nan,
+            'residual_std_error': np.sqrt(rss / (self.count - k)) if self.count > k else np.nan,
+        }
+
+    def result(self, num_points=100):
+        polynomial = self.polynomial()
+        x_new = np.linspace(self.x_min, self.x_max, num_points)
+        coeffs = polynomial.convert().coef[::-1]
+        coeffs = np.r_[np.zeros(self.degree + 1 - len(coeffs)), coeffs]
+        return PolynomialFit(coeffs, x_new, polynomial(x_new), self.statistics()['r_squared'])
+
+
+def best_degree_index(scan, criterion):
+    field, higher_is_better = CRITERIA[criterion]
+    scores = np.nan_to_num(getattr(scan, field), nan=-np.inf if higher_is_better else np.inf)
+    return int(np.argmax(scores) if higher_is_better else np.argmin(scores))
+
+
+def format_equation(coeffs):
+    degree = len(coeffs) - 1
+    eq = f"y = {coeffs[0]:.4f}"
+    for i, coeff in enumerate(coeffs[1:], 1):
+        eq += f" + {coeff:.4f}x^{degree - i}"
+    return eq
+
+
+def data_fingerprint(*arrays):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+class FitCache:
+    # Bounded LRU cache of fitted curves. Keys start with the fingerprint of
+    # the data followed by every parameter the result depends on, so
+    # cosmetic redraws (title, labels, stopping an animation) reuse results.
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, compute):
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def items(self):
+        # Least recently used first, so putting them back keeps the order
+        return list(self._entries.items())
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"FitCache({len(self)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses)"
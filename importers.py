@@ -0,0 +1,244 @@
+import datetime
+import os
+import time
+from itertools import islice
+from operator import itemgetter
+
+import numpy as np
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# pandas is imported by the functions that parse files rather than here, so
+# the GUI can start without loading it
+CHUNK_ROWS = 250_000
+# Rows are parsed one at a time from the sheet XML, so chunks are smaller
+XLSX_CHUNK_ROWS = 50_000
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def read_preview(file_path, num_rows=6, sheet=None):
+    # Only the first few rows are read so the headers prompt appears
+    # immediately, however large the file is.
+    if file_path.endswith('.xlsx'):
+        workbook, worksheet = open_xlsx_sheet(file_path, sheet)
+        try:
+            worksheet.reset_dimensions()
+            rows = [['' if cell is None else cell for cell in row]
+                    for row in worksheet.iter_rows(min_row=1, max_row=num_rows, values_only=True)]
+        finally:
+            workbook.close()
+        # Without the sheet dimensions rows are only as long as their last cell
+        width = max((len(row) for row in rows), default=0)
+        return [row + [''] * (width - len(row)) for row in rows]
+    import csv
+    with open(file_path, 'r', newline='') as f:
+        return [row for row in islice(csv.reader(f), num_rows)]
+
+
+def column_letter(index):
+    # 0 -> A, 25 -> Z, 26 -> AA, as spreadsheet columns are named
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def detect_headers(rows):
+    # A first row with text that is neither a number nor a date is taken as
+    # headers; blank cells count as neither
+    if not rows:
+        return False
+    for cell in rows[0][:2]:
+        if cell is None or (isinstance(cell, str) and not cell.strip()):
+            continue
+        if np.isnan(cell_to_float(cell)):
+            return True
+    return False
+
+
+def to_float_columns(frame, columns=2):
+    # Coerce the first columns of a chunk to float64, turning anything that
+    # does not parse into NaN so it is masked out as an invalid row.
+    import pandas as pd
+    arrays = []
+    for i in range(columns):
+        if i < frame.shape[1]:
+            column = frame.iloc[:, i]
+            if column.dtype.kind not in 'fiu':
+                column = pd.to_numeric(column, errors='coerce')
+            arrays.append(column.to_numpy(dtype=np.float64))
+        else:
+            arrays.append(np.full(len(frame), np.nan))
+    return arrays
+
+
+def split_columns(arrays):
+    # First column is x, the rest are the y series as an n x k array
+    return arrays[0], np.column_stack(arrays[1:])
+
+
+def iter_csv_chunks(file_path, skip_rows=0, progress=None, is_cancelled=None, chunk_rows=CHUNK_ROWS, columns=2):
+    # Parse the file in chunks with the C parser, yielding each as a
+    # chunk_rows x columns float64 array, so only one chunk is in memory.
+    # progress(rows, fraction) is called after every chunk, and
+    # is_cancelled() is polled between chunks.
+    import pandas as pd
+    total_bytes = os.path.getsize(file_path) or 1
+    rows = 0
+    with open(file_path, 'rb') as f:
+        reader = pd.read_csv(f, header=None, skiprows=skip_rows, usecols=list(range(columns)), chunksize=chunk_rows,
+                             skip_blank_lines=True, on_bad_lines='skip')
+        for chunk in reader:
+            if is_cancelled and is_cancelled():
+                raise ImportCancelled()
+            yield np.column_stack(to_float_columns(chunk, columns))
+            rows += len(chunk)
+            if progress:
+                progress(rows, min(f.tell() / total_bytes, 1.0))
+
+
+def load_csv(file_path, skip_rows=0, progress=None, is_cancelled=None, chunk_rows=CHUNK_ROWS, columns=2):
+    # Returns x and an n x (columns - 1) array of y series
+    chunks = list(iter_csv_chunks(file_path, skip_rows, progress, is_cancelled, chunk_rows, columns))
+    if not chunks:
+        return np.empty(0), np.empty((0, columns - 1))
+    return split_columns(np.concatenate(chunks).T)
+
+
+def open_xlsx_sheet(file_path, sheet=None):
+    # Read-only mode parses the sheet as it is iterated instead of building
+    # every cell up front; data_only gives the cached values of formulas.
+    # The first sheet is used when none is named, as pandas does.
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+    except KeyError:
+        workbook.close()
+        raise ValueError(f"No sheet named {sheet!r}")
+    return workbook, worksheet
+
+
+def xlsx_sheet_names(file_path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, keep_links=False)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def cell_to_float(value):
+    # Numbers as they are, numeric text parsed, and dates as nanoseconds
+    # since the epoch as pandas gives them; anything else is NaN
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return float(np.datetime64(value, 'ns').astype(np.int64))
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def cells_to_floats(rows):
+    # Plain numbers and empty cells (None -> NaN) convert in one call; only
+    # chunks holding text or dates go cell by cell
+    try:
+        return np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([[cell_to_float(cell) for cell in row] for row in rows], dtype=np.float64)
+
+
+def iter_xlsx_chunks(file_path, skip_rows=0, progress=None, is_cancelled=None, chunk_rows=XLSX_CHUNK_ROWS,
+                     usecols=(0, 1), sheet=None):
+    # Streams the rows of one sheet, keeping only the usecols columns, and
+    # yields them as chunk_rows x len(usecols) float64 arrays. Rows with
+    # none of those cells filled in are dropped.
+    workbook, worksheet = open_xlsx_sheet(file_path, sheet)
+    try:
+        # The used range stored in the file only estimates the progress, as
+        # some writers get it wrong and trusting it could cut the rows short
+        total_rows = worksheet.max_row
+        worksheet.reset_dimensions()
+        pick = itemgetter(*usecols)
+        empty = (None,) * len(usecols)
+        rows = 0
+        chunk = []
+        for row in worksheet.iter_rows(min_row=skip_rows + 1, max_col=max(usecols) + 1, values_only=True):
+            cells = pick(row)
+            if cells != empty:
+                chunk.append(cells)
+            if len(chunk) == chunk_rows:
+                if is_cancelled and is_cancelled():
+                    raise ImportCancelled()
+                yield cells_to_floats(chunk)
+                rows += len(chunk)
+                chunk = []
+                if progress:
+                    progress(rows, min(rows / total_rows, 1.0) if total_rows else 0.0)
+        if chunk:
+            yield cells_to_floats(chunk)
+            rows += len(chunk)
+        if progress:
+            progress(rows, 1.0)
+    finally:
+        workbook.close()
+
+
+def load_xlsx(file_path, skip_rows=0, progress=None, is_cancelled=None, columns=2, sheet=None, usecols=None,
+              chunk_rows=XLSX_CHUNK_ROWS):
+    # usecols picks the x column followed by the y columns; by default the
+    # first columns are used, like load_csv
+    usecols = list(usecols) if usecols is not None else list(range(columns))
+    chunks = list(iter_xlsx_chunks(file_path, skip_rows, progress, is_cancelled, chunk_rows, usecols, sheet))
+    if not chunks:
+        return np.empty(0), np.empty((0, len(usecols) - 1))
+    return split_columns(np.concatenate(chunks).T)
+
+
+class ImportWorker(QThread):
+    # progress(rows, rows per second, percent)
+    progress = pyqtSignal(int, float, int)
+    loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, file_path, skip_rows=0, columns=2, parent=None, sheet=None, usecols=None):
+        # sheet and usecols only apply to workbooks
+        super().__init__(parent)
+        self.file_path = file_path
+        self.skip_rows = skip_rows
+        self.columns = columns
+        self.sheet = sheet
+        self.usecols = usecols
+        self._cancel_requested = False
+        self._start_time = None
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def report_progress(self, rows, fraction):
+        elapsed = max(time.perf_counter() - self._start_time, 1e-9)
+        self.progress.emit(rows, rows / elapsed, int(fraction * 100))
+
+    def run(self):
+        self._start_time = time.perf_counter()
+        try:
+            if self.file_path.endswith('.xlsx'):
+                x, y = load_xlsx(self.file_path, self.skip_rows, self.report_progress, self.is_cancelled,
+                                 columns=self.columns, sheet=self.sheet, usecols=self.usecols)
+            else:
+                x, y = load_csv(self.file_path, self.skip_rows, self.report_progress, self.is_cancelled,
+                                columns=self.columns)
+        except ImportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.loaded.emit(x, y)
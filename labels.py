@@ -0,0 +1,73 @@
+import re
+import shutil
+from functools import lru_cache
+
+from matplotlib.texmanager import TexManager
+
+SUPERSCRIPT_MAP = {
+    '0': '⁰', '1': '¹', '2': '²', '3': '³', '4': '⁴', '5': '⁵', '6': '⁶', '7': '⁷', '8': '⁸', '9': '⁹',
+    'a': 'ᵃ', 'b': 'ᵇ', 'c': 'ᶜ', 'd': 'ᵈ', 'e': 'ᵉ', 'f': 'ᶠ', 'g': 'ᵍ', 'h': 'ʰ', 'i': 'ⁱ', 'j': 'ʲ',
+    'k': 'ᵏ', 'l': 'ˡ', 'm': 'ᵐ', 'n': 'ⁿ', 'o': 'ᵒ', 'p': 'ᵖ', 'q': 'q', 'r': 'ʳ', 's': 'ˢ', 't': 'ᵗ',
+    'u': 'ᵘ', 'v': 'ᵛ', 'w': 'ʷ', 'x': 'ˣ', 'y': 'ʸ', 'z': 'ᶻ',
+    'A': 'ᴬ', 'B': 'ᴮ', 'C': 'ᶜ', 'D': 'ᴰ', 'E': 'ᴱ', 'F': 'ᶠ', 'G': 'ᴳ', 'H': 'ᴴ', 'I': 'ᴵ', 'J': 'ᴶ',
+    'K': 'ᴷ', 'L': 'ᴸ', 'M': 'ᴹ', 'N': 'ᴺ', 'O': 'ᴼ', 'P': 'ᴾ', 'Q': 'Q', 'R': 'ᴿ', 'S': 'ˢ', 'T': 'ᵀ',
+    'U': 'ᵁ', 'V': 'ⱽ', 'W': 'ᵂ', 'X': 'ˣ', 'Y': 'ʸ', 'Z': 'ᶻ',
+    '+': '⁺', '-': '⁻', '=': '⁼', '(': '⁽', ')': '⁾', ':': '︓', '>': '˃', '<': '˂', '/': 'ᐟ', '\\': '˂'
+}
+SUPERSCRIPT_PATTERN = re.compile(r'\^(-?\d+|\(-?[^()]+\)|[a-zA-Z]+)')
+
+
+def replace_superscript(match):
+    exp = match.group(1)
+    if exp.startswith('(') and exp.endswith(')'):
+        exp = exp[1:-1]  # Remove parentheses
+    return ''.join(SUPERSCRIPT_MAP.get(char, char) for char in exp)
+
+
+@lru_cache(maxsize=256)
+def format_superscript(text):
+    return SUPERSCRIPT_PATTERN.sub(replace_superscript, text)
+
+
+class LabelRenderer:
+    # Sets the title and axis labels. Whether TeX is installed is checked
+    # once, each label string is validated and formatted once per (text,
+    # mode, font size), and usetex is applied to the label artists only
+    # instead of flipping the global rcParams. Labels that have not changed
+    # are left alone so matplotlib keeps its cached text layout.
+    def __init__(self):
+        self.tex_available = all(shutil.which(tool) for tool in ('latex', 'dvipng'))
+        self._warned = False
+        self._cache = {}
+
+    def render(self, text, use_latex, fontsize):
+        # Returns (string, usetex) for a label
+        key = (text, 'latex' if use_latex else 'plain', fontsize)
+        if key not in self._cache:
+            self._cache[key] = self._render(text, use_latex, fontsize)
+        return self._cache[key]
+
+    def _render(self, text, use_latex, fontsize):
+        if use_latex:
+            tex = f'${text}$'
+            try:
+                if not self.tex_available:
+                    raise RuntimeError("latex and dvipng were not found")
+                # Run TeX now rather than failing at draw time
+                TexManager().get_text_width_height_descent(tex, fontsize)
+                return tex, True
+            except Exception as e:
+                if not self._warned:
+                    print(f"LaTeX rendering failed: {e}")
+                    print("Falling back to standard text rendering with superscript formatting")
+                    self._warned = True
+        return format_superscript(text), False
+
+    def apply(self, ax, x_label, y_label, title, use_latex):
+        for artist, text in ((ax.xaxis.label, x_label), (ax.yaxis.label, y_label), (ax.title, title)):
+            string, usetex = self.render(text, use_latex, artist.get_fontsize())
+            if artist.get_text() == string and artist.get_usetex() == usetex:
+                continue
+            artist.set_text(string)
+            artist.set_usetex(usetex)
+            artist.set_fontfamily('serif' if usetex else None)
@@ -1,20 +1,40 @@
+import os
 import sys
+import time
+start_time = time.perf_counter()  # Reported by --profile-startup
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QTableWidget, QTableWidgetItem, QLineEdit, QLabel,
+                             QPushButton, QTableView, QTableWidget, QTableWidgetItem, QLineEdit, QLabel,
                              QCheckBox, QMenuBar, QMenu, QFileDialog, QInputDialog, QComboBox,
-                             QSlider, QDialog, QSpinBox, QMessageBox)
-from PyQt6.QtCore import Qt
+                             QSlider, QDialog, QDialogButtonBox, QSpinBox, QMessageBox, QProgressDialog,
+                             QListWidget, QListWidgetItem)
+from PyQt6.QtCore import Qt, QEvent, QObject, QTimer
 from PyQt6.QtGui import QAction
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.animation import FuncAnimation
-import matplotlib
-import re
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT
 import numpy as np
-from scipy import interpolate
-from scipy import stats
-import pandas as pd
-import csv
+from dataset import Dataset, DataTableModel
+from importers import ImportWorker, cell_to_float, column_letter, detect_headers, read_preview, xlsx_sheet_names
+from decimation import LevelOfDetail, METHODS as DECIMATION_METHODS, decimate
+from fitting import (AGGREGATIONS, CRITERIA, FitCache, best_degree_index, data_fingerprint, format_equation, polynomial_degree_scan,
+                     polynomial_fit, smooth_curve)
+from plotting import INTERPOLATION_KINDS, STYLES, draw_plot, draw_series, fit_curves, fit_request, series_batches
+from labels import LabelRenderer
+from workers import BACKGROUND_THRESHOLD, PENDING, ComputeRunner
+from streaming import FileTailer, FitFileWorker, RingBuffer
+from profiling import profiler
+from project import PROJECT_EXTENSION, load_project as read_project, save_project as write_project
+from plot_export import EXPORT_FORMATS, PlotExportWorker, export_report
+imports_done_time = time.perf_counter()
+
+PROJECT_FILTER = f"Project Files (*{PROJECT_EXTENSION})"
+# Larger on disk, but the data is memory-mapped on load instead of decompressed
+UNCOMPRESSED_PROJECT_FILTER = f"Uncompressed Project Files (*{PROJECT_EXTENSION})"
+PLOT_FILTERS = ";;".join(f"{fmt.upper()} Files (*.{fmt})" for fmt in EXPORT_FORMATS) + ";;All Files (*)"
+
+# First paint should come within this many seconds of starting
+STARTUP_TARGET = 1.0
+# Loaded on first use, so none of these should be imported at startup
+LAZY_MODULES = ['scipy', 'pandas', 'openpyxl', 'matplotlib.animation', 'matplotlib.pyplot']
 
 
 class PlotterApp(QMainWindow):
@@ -26,7 +46,33 @@ class PlotterApp(QMainWindow):
         self.graph_title = "Line Plot"
         self.plot_style = "Connecting Lines"
         self.animation = None
+        self.animator = None
         self.animation_speed = 500  # milliseconds
+        self.import_worker = None
+        self.fit_file_worker = None
+        self.animation_export_worker = None
+        self.plot_export_worker = None
+        self.import_headers = None
+        self.level_of_detail = None
+        self.fit_cache = FitCache()
+        self.compute_in_background = True
+        self.compute_runner = ComputeRunner(self)
+        self.compute_runner.finished.connect(self.fit_computed)
+        self.compute_runner.failed.connect(self.fit_failed)
+        self.has_plot = False
+        self.label_renderer = LabelRenderer()  # Checks for TeX once
+        self.follow_timer = None
+        self.follow_tailer = None
+        self.follow_buffer = None
+        self.follow_line = None
+        self.best_fit_window = None
+        self.timings_label = QLabel()
+        self.timings_label.hide()
+        self.statusBar().addPermanentWidget(self.timings_label)
+        # The readout is refreshed a few times a second rather than on every frame
+        self.timings_timer = QTimer(self)
+        self.timings_timer.timeout.connect(self.update_timings)
+        self.shown_timings = None
 
         # Create menu bar
         self.create_menu_bar()
@@ -43,9 +89,11 @@ class PlotterApp(QMainWindow):
         import_button = QPushButton('Import Data')
         import_button.clicked.connect(self.import_data)
         left_layout.addWidget(import_button)
-        # Create table for data entry
-        self.table = QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(['X', 'Y'])
+        # Create table for data entry, backed by a columnar dataset
+        self.dataset = Dataset()
+        self.table_model = DataTableModel(self.dataset)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         left_layout.addWidget(self.table)
 
         # Create 'Add Row' button
@@ -70,10 +118,17 @@ class PlotterApp(QMainWindow):
         style_layout = QHBoxLayout()
         style_layout.addWidget(QLabel('Plot Style:'))
         self.style_dropdown = QComboBox()
-        self.style_dropdown.addItems(["Connecting Lines", "Smooth Curve", "Polynomial Fit"])
+        self.style_dropdown.addItems(STYLES)
         style_layout.addWidget(self.style_dropdown)
         left_layout.addLayout(style_layout)
 
+        # Series list for multi-column data, each with its own plot style
+        self.series_table = QTableWidget(0, 2)
+        self.series_table.setHorizontalHeaderLabels(['Series', 'Style'])
+        self.series_table.hide()
+        self.series_table.itemChanged.connect(self.parameters_changed)
+        left_layout.addWidget(self.series_table)
+
         # Add polynomial degree spinner
         poly_layout = QHBoxLayout()
         poly_layout.addWidget(QLabel('Polynomial Degree:'))
@@ -88,10 +143,18 @@ class PlotterApp(QMainWindow):
         interp_layout = QHBoxLayout()
         interp_layout.addWidget(QLabel('Interpolation:'))
         self.interp_dropdown = QComboBox()
-        self.interp_dropdown.addItems(["linear", "quadratic", "cubic"])
+        self.interp_dropdown.addItems(INTERPOLATION_KINDS)
         interp_layout.addWidget(self.interp_dropdown)
         left_layout.addLayout(interp_layout)
 
+        # How the y-values of repeated x-values are combined before smoothing
+        duplicates_layout = QHBoxLayout()
+        duplicates_layout.addWidget(QLabel('Duplicate X:'))
+        self.duplicates_dropdown = QComboBox()
+        self.duplicates_dropdown.addItems(AGGREGATIONS)
+        duplicates_layout.addWidget(self.duplicates_dropdown)
+        left_layout.addLayout(duplicates_layout)
+
         # Add slider for number of interpolation points
         points_layout = QHBoxLayout()
         points_layout.addWidget(QLabel('Interpolation Points:'))
@@ -109,6 +172,14 @@ class PlotterApp(QMainWindow):
         # Connect the slider to update the label
         self.points_slider.valueChanged.connect(self.update_points_label)
 
+        # Add decimation dropdown for large datasets
+        decimation_layout = QHBoxLayout()
+        decimation_layout.addWidget(QLabel('Decimation:'))
+        self.decimation_dropdown = QComboBox()
+        self.decimation_dropdown.addItems(list(DECIMATION_METHODS))
+        decimation_layout.addWidget(self.decimation_dropdown)
+        left_layout.addLayout(decimation_layout)
+
         # Add LaTeX checkbox
         self.latex_checkbox = QCheckBox("Use LaTeX rendering (if available)")
         left_layout.addWidget(self.latex_checkbox)
@@ -129,6 +200,14 @@ class PlotterApp(QMainWindow):
         animation_layout.addWidget(QLabel('Speed:'))
         animation_layout.addWidget(self.speed_slider)
 
+        # Number of points revealed per animation frame
+        self.stride_spinner = QSpinBox()
+        self.stride_spinner.setMinimum(1)
+        self.stride_spinner.setMaximum(1000000)
+        self.stride_spinner.setValue(1)
+        animation_layout.addWidget(QLabel('Points/frame:'))
+        animation_layout.addWidget(self.stride_spinner)
+
         left_layout.addLayout(animation_layout)
 
         # Create 'Plot' button
@@ -141,15 +220,28 @@ class PlotterApp(QMainWindow):
         best_fit_button.clicked.connect(self.open_best_fit_window)
         left_layout.addWidget(best_fit_button)
 
+        # Refit when the fit parameters change
+        self.style_dropdown.currentTextChanged.connect(self.parameters_changed)
+        self.interp_dropdown.currentTextChanged.connect(self.parameters_changed)
+        self.duplicates_dropdown.currentTextChanged.connect(self.parameters_changed)
+        self.points_slider.valueChanged.connect(self.parameters_changed)
+        self.poly_degree_spinner.valueChanged.connect(self.parameters_changed)
+
         # Create right panel for plot display
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         main_layout.addWidget(right_panel)
 
         # Create matplotlib figure and canvas
-        self.figure, self.ax = plt.subplots()
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot()
         self.canvas = FigureCanvas(self.figure)
         right_layout.addWidget(self.canvas)
+        # Zooming and panning re-decimate the lines for the visible range
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        right_layout.addWidget(self.toolbar)
+        # The number of points kept follows the width of the axes
+        self.canvas.mpl_connect('resize_event', self.canvas_resized)
     def update_points_label(self, value):
         self.points_label.setText(str(value))
     def create_menu_bar(self):
@@ -171,6 +263,39 @@ class PlotterApp(QMainWindow):
         save_action.triggered.connect(self.save_plot)
         file_menu.addAction(save_action)
 
+        # Several formats and resolutions at once
+        export_plot_action = QAction("Export Plot...", self)
+        export_plot_action.setShortcut("Ctrl+E")
+        export_plot_action.triggered.connect(self.export_plot)
+        file_menu.addAction(export_plot_action)
+
+        # Render the animation to a GIF or MP4 file
+        export_animation_action = QAction("Export Animation...", self)
+        export_animation_action.triggered.connect(self.export_animation)
+        file_menu.addAction(export_animation_action)
+
+        # Project actions: the data, settings and fits in one file
+        open_project_action = QAction("Open Project...", self)
+        open_project_action.setShortcut("Ctrl+O")
+        open_project_action.triggered.connect(self.open_project)
+        file_menu.addAction(open_project_action)
+
+        save_project_action = QAction("Save Project...", self)
+        save_project_action.setShortcut("Ctrl+Shift+S")
+        save_project_action.triggered.connect(self.save_project)
+        file_menu.addAction(save_project_action)
+
+        # Fit a CSV too large to load, reading it in chunks
+        fit_file_action = QAction("Fit Large File...", self)
+        fit_file_action.triggered.connect(self.fit_large_file)
+        file_menu.addAction(fit_file_action)
+
+        # Follow action: tail a growing CSV
+        self.follow_action = QAction("Follow File...", self)
+        self.follow_action.setCheckable(True)
+        self.follow_action.triggered.connect(self.toggle_follow)
+        file_menu.addAction(self.follow_action)
+
         # Edit menu
         edit_menu = menu_bar.addMenu("Edit")
 
@@ -179,6 +304,21 @@ class PlotterApp(QMainWindow):
         set_title_action.triggered.connect(self.set_graph_title)
         edit_menu.addAction(set_title_action)
 
+        # View menu
+        view_menu = menu_bar.addMenu("View")
+
+        # Per-stage timings of the last plot, animation frame or fit
+        show_timings_action = QAction("Show Timings", self)
+        show_timings_action.setCheckable(True)
+        show_timings_action.toggled.connect(self.toggle_timings)
+        view_menu.addAction(show_timings_action)
+
+        # Record every stage to a trace file
+        self.record_trace_action = QAction("Record Trace", self)
+        self.record_trace_action.setCheckable(True)
+        self.record_trace_action.toggled.connect(self.toggle_trace)
+        view_menu.addAction(self.record_trace_action)
+
     def import_data(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Import Data", "", "CSV Files (*.csv);;Excel Files (*.xlsx)")
         if file_path:
@@ -188,22 +328,33 @@ class PlotterApp(QMainWindow):
                 self.import_xlsx(file_path)
 
     def import_csv(self, file_path):
-        with open(file_path, 'r') as f:
-            reader = csv.reader(f)
-            data = list(reader)
-        self.process_imported_data(data)
+        self.process_imported_data(file_path, read_preview(file_path))
 
     def import_xlsx(self, file_path):
-        df = pd.read_excel(file_path, header=None)
-        data = df.values.tolist()
-        self.process_imported_data(data)
-
-    def process_imported_data(self, data):
-        if len(data[0]) != 2:
-            QMessageBox.warning(self, "Invalid Data", "Please ensure your file contains exactly two columns of data.")
+        # Workbooks get a sheet and column picker rather than the headers prompt
+        try:
+            sheet_names = xlsx_sheet_names(file_path)
+        except Exception as e:
+            self.import_failed(str(e))
+            return
+        dialog = ExcelImportDialog(file_path, sheet_names, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        columns = dialog.columns()
+        headers = dialog.headers()
+        self.import_headers = [headers[i] for i in columns] if headers else None
+        self.start_import(file_path, 1 if headers else 0, len(columns), dialog.sheet(), columns)
+
+    def process_imported_data(self, file_path, data):
+        if not data or len(data[0]) < 2:
+            QMessageBox.warning(self, "Invalid Data",
+                                "Please ensure your file contains an X column and at least one Y column.")
             return
 
-        preview = "\n".join([f"{row[0]}, {row[1]}" for row in data[:5]])
+        # The first column is X; every further column is a Y series
+        columns = len(data[0])
+        preview = "\n".join([", ".join(str(cell) for cell in row[:6]) + (", ..." if columns > 6 else "")
+                             for row in data[:5]])
         preview += "\n...\n" if len(data) > 5 else ""
 
         msg = QMessageBox()
@@ -217,185 +368,416 @@ class PlotterApp(QMainWindow):
             return
 
         has_headers = response == QMessageBox.StandardButton.Yes
+        self.import_headers = data[0] if has_headers else None
+        self.start_import(file_path, 1 if has_headers else 0, columns)
+
+    def new_progress_dialog(self, title, text):
+        progress = QProgressDialog(text, "Cancel", 0, 100, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        return progress
+
+    def start_import(self, file_path, skip_rows, columns=2, sheet=None, usecols=None):
+        # Parse on a worker thread; the table is filled once at the end
+        self.import_progress = self.new_progress_dialog("Import Data", "Importing data...")
+
+        self.import_worker = ImportWorker(file_path, skip_rows, columns, self, sheet, usecols)
+        self.import_worker.progress.connect(self.update_import_progress)
+        self.import_worker.loaded.connect(self.finish_import)
+        self.import_worker.failed.connect(self.import_failed)
+        self.import_worker.cancelled.connect(lambda: print("Import cancelled"))
+        self.import_worker.finished.connect(self.import_progress.reset)
+        self.import_progress.canceled.connect(self.import_worker.cancel)
+        self.import_worker.start()
+
+    def update_import_progress(self, rows, rows_per_second, percent):
+        self.import_progress.setValue(percent)
+        self.import_progress.setLabelText(f"Imported {rows:,} rows ({rows_per_second:,.0f} rows/s)")
+
+    def import_failed(self, message):
+        QMessageBox.warning(self, "Import Failed", f"Could not import the file:\n{message}")
+
+    def finish_import(self, x_values, y_values):
+        names = None
+        if self.import_headers:
+            names = [str(header) for header in self.import_headers[1:]]
+            self.x_axis_input.setText(str(self.import_headers[0]))
+            if len(names) == 1:
+                self.y_axis_input.setText(names[0])
+        self.table_model.set_arrays(x_values, y_values, names)
+        self.update_series_table()
+
+        QMessageBox.information(self, "Import Successful", f"Imported {len(self.dataset)} rows of data.")
 
-        self.table.setRowCount(0)  # Clear existing data
-        start_row = 1 if has_headers else 0
+    def save_plot(self):
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Save Plot", "", PLOT_FILTERS)
+        if not file_path:
+            return
+        # The format follows the extension, or the chosen filter without one
+        fmt = os.path.splitext(file_path)[1].lower().lstrip('.')
+        if fmt not in EXPORT_FORMATS:
+            fmt = selected_filter.split(' ')[0].lower()
+            fmt = fmt if fmt in EXPORT_FORMATS else 'png'
+            file_path += '.' + fmt
+        self.start_plot_export(file_path, [fmt], [None])
+
+    def export_plot(self):
+        dialog = ExportPlotDialog(self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Plot", "", "All Files (*)")
+        if file_path:
+            self.start_plot_export(file_path, dialog.formats(), dialog.dpis(), dialog.rasterize_checkbox.isChecked())
+
+    def start_plot_export(self, file_path, formats, dpis, rasterize=True):
+        # Drawn from a snapshot of the figure on a worker thread, so the
+        # window stays responsive however long the files take
+        # The lines on screen keep about one point per screen pixel, so they
+        # are re-decimated from the full data for the largest export first
+        level_of_detail = self.active_level_of_detail()
+        if level_of_detail is not None:
+            level_of_detail.refine(scale=max(dpi or self.figure.dpi for dpi in dpis) / self.figure.dpi)
+        self.plot_export_worker = PlotExportWorker(self.figure, file_path, formats, dpis, rasterize, self)
+        if level_of_detail is not None:
+            level_of_detail.refine()
+        self.plot_export_worker.exported.connect(self.plot_exported)
+        self.plot_export_worker.failed.connect(
+            lambda message: QMessageBox.warning(self, "Export Failed", f"Could not save the plot:\n{message}"))
+        self.statusBar().showMessage("Saving plot...")
+        self.plot_export_worker.start()
+
+    def plot_exported(self, results):
+        report = export_report(results)
+        print(f"Plot saved: {report}")
+        self.statusBar().showMessage(f"Saved {report}")
+
+    def fit_large_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Fit Large File", "", "CSV Files (*.csv)")
+        if not file_path:
+            return
+        degree, ok = QInputDialog.getInt(self, "Fit Large File", "Polynomial degree:",
+                                         self.poly_degree_spinner.value(), 1, 10)
+        if not ok:
+            return
 
-        for row in data[start_row:]:
-            self.add_row()
-            self.table.setItem(self.table.rowCount() - 1, 0, QTableWidgetItem(str(row[0])))
-            self.table.setItem(self.table.rowCount() - 1, 1, QTableWidgetItem(str(row[1])))
+        # The file is read once in chunks; only the fit and a decimated copy
+        # of the points are kept, and the table is left as it is
+        self.fit_file_progress = self.new_progress_dialog("Fit Large File", "Fitting...")
+        self.fit_file_worker = FitFileWorker(file_path, degree, self)
+        self.fit_file_worker.progress.connect(self.update_fit_file_progress)
+        self.fit_file_worker.fitted.connect(self.show_file_fit)
+        self.fit_file_worker.failed.connect(
+            lambda message: QMessageBox.warning(self, "Fit Failed", f"Could not fit the file:\n{message}"))
+        self.fit_file_worker.cancelled.connect(lambda: print("Fit cancelled"))
+        self.fit_file_worker.finished.connect(self.fit_file_progress.reset)
+        self.fit_file_progress.canceled.connect(self.fit_file_worker.cancel)
+        self.fit_file_worker.start()
+
+    def update_fit_file_progress(self, rows, rows_per_second, percent):
+        self.fit_file_progress.setValue(percent)
+        self.fit_file_progress.setLabelText(f"Fitted {rows:,} rows ({rows_per_second:,.0f} rows/s)")
+
+    def show_file_fit(self, points, fit):
+        try:
+            result = fit.result()
+        except ValueError as e:
+            QMessageBox.warning(self, "Fit Failed", str(e))
+            return
+        stats = fit.statistics()
+        self.stop_follow()
+        self.stop_animation()
+        # A fit finishing now would replot the table over the file's fit
+        self.compute_runner.cancel_all()
+        self.statusBar().clearMessage()
+        self.has_plot = False  # Not the table's data, so parameter changes must not replot over it
 
-        if has_headers:
-            self.x_axis_input.setText(str(data[0][0]))
-            self.y_axis_input.setText(str(data[0][1]))
+        self.ax.clear()
+        draw_plot(self.ax, *points, "Polynomial Fit", result)
+        self.set_labels()
+        self.canvas.draw()
+        self.toolbar.update()
+
+        print(f"Polynomial fit equation: {format_equation(result.coeffs)}")
+        print(f"R-squared: {result.r_squared:.4f}")
+        self.statusBar().showMessage(f"Fitted {stats['points']:,} points: R² {stats['r_squared']:.4f}, "
+                                     f"RMSE {stats['rmse']:.4g}, residual standard error "
+                                     f"{stats['residual_std_error']:.4g}; showing {len(points[0]):,} points")
+
+    def save_project(self):
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Save Project", "", f"{PROJECT_FILTER};;{UNCOMPRESSED_PROJECT_FILTER}")
+        if not file_path:
+            return
+        if not file_path.endswith(PROJECT_EXTENSION):
+            file_path += PROJECT_EXTENSION
+        try:
+            write_project(file_path, self.dataset, self.project_settings(), self.fit_cache.items(),
+                          compress=selected_filter != UNCOMPRESSED_PROJECT_FILTER)
+        except OSError as e:
+            QMessageBox.warning(self, "Save Failed", f"Could not save the project:\n{e}")
+            return
+        print(f"Project saved as {file_path}")
 
-        QMessageBox.information(self, "Import Successful", f"Imported {self.table.rowCount()} rows of data.")
+    def open_project(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Project", "", PROJECT_FILTER)
+        if not file_path:
+            return
+        try:
+            project = read_project(file_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Open Failed", f"Could not open the project:\n{e}")
+            return
 
-    def save_plot(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Plot", "", "PNG Files (*.png);;All Files (*)")
-        if file_path:
-            self.figure.savefig(file_path, bbox_inches='tight')
-            print(f"Plot saved as {file_path}")
+        self.stop_follow()
+        self.stop_animation()
+        # Nothing is replotted while the settings are applied one by one
+        self.has_plot = False
+        self.table_model.set_arrays(project.x, project.ys, project.series_names, copy=False)
+        self.dataset.restore_caches(project.order, project.fingerprint)
+        self.update_series_table()
+        self.apply_project_settings(project.settings)
+        for key, value in project.fits:
+            self.fit_cache.put(key, value)
+        self.plot_data()
+
+    def project_settings(self):
+        return {
+            'title': self.graph_title,
+            'x_label': self.x_axis_input.text(),
+            'y_label': self.y_axis_input.text(),
+            'style': self.style_dropdown.currentText(),
+            'interpolation': self.interp_dropdown.currentText(),
+            'points': self.points_slider.value(),
+            'degree': self.poly_degree_spinner.value(),
+            'duplicates': self.duplicates_dropdown.currentText(),
+            'decimation': self.decimation_dropdown.currentText(),
+            'latex': self.latex_checkbox.isChecked(),
+            'animation_speed': self.speed_slider.value(),
+            'points_per_frame': self.stride_spinner.value(),
+            'series': [[self.series_table.item(row, 0).checkState() == Qt.CheckState.Checked,
+                        self.series_table.cellWidget(row, 1).currentText()]
+                       for row in range(self.series_table.rowCount())],
+        }
+
+    def apply_project_settings(self, settings):
+        # Settings missing from the project keep their current values
+        self.graph_title = settings.get('title', self.graph_title)
+        self.x_axis_input.setText(settings.get('x_label', self.x_axis_input.text()))
+        self.y_axis_input.setText(settings.get('y_label', self.y_axis_input.text()))
+        self.style_dropdown.setCurrentText(settings.get('style', self.style_dropdown.currentText()))
+        self.interp_dropdown.setCurrentText(settings.get('interpolation', self.interp_dropdown.currentText()))
+        self.points_slider.setValue(settings.get('points', self.points_slider.value()))
+        self.poly_degree_spinner.setValue(settings.get('degree', self.poly_degree_spinner.value()))
+        self.duplicates_dropdown.setCurrentText(settings.get('duplicates', self.duplicates_dropdown.currentText()))
+        self.decimation_dropdown.setCurrentText(settings.get('decimation', self.decimation_dropdown.currentText()))
+        self.latex_checkbox.setChecked(settings.get('latex', self.latex_checkbox.isChecked()))
+        self.speed_slider.setValue(settings.get('animation_speed', self.speed_slider.value()))
+        self.stride_spinner.setValue(settings.get('points_per_frame', self.stride_spinner.value()))
+        for row, (visible, style) in enumerate(settings.get('series', [])[:self.series_table.rowCount()]):
+            self.series_table.item(row, 0).setCheckState(
+                Qt.CheckState.Checked if visible else Qt.CheckState.Unchecked)
+            self.series_table.cellWidget(row, 1).setCurrentText(style)
 
     def set_graph_title(self):
         title, ok = QInputDialog.getText(self, "Set Graph Title", "Enter graph title:")
         if ok and title:
             self.graph_title = title
-            self.plot_data()  # Redraw the plot with the new title
+            if self.follow_timer is not None:
+                # Replotting would stop following; only the labels change
+                self.set_labels()
+                self.canvas.draw_idle()
+            else:
+                self.plot_data()  # Redraw the plot with the new title
+
+    def update_series_table(self):
+        # Only shown when the data has more than one Y series
+        self.series_table.blockSignals(True)
+        self.series_table.setRowCount(0)
+        if self.dataset.num_series > 1:
+            self.series_table.setRowCount(self.dataset.num_series)
+            for row, name in enumerate(self.dataset.series_names):
+                item = QTableWidgetItem(name)
+                item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+                item.setCheckState(Qt.CheckState.Checked)
+                self.series_table.setItem(row, 0, item)
+                style_dropdown = QComboBox()
+                style_dropdown.addItems(["Default"] + STYLES)
+                style_dropdown.currentTextChanged.connect(self.parameters_changed)
+                self.series_table.setCellWidget(row, 1, style_dropdown)
+        self.series_table.setVisible(self.dataset.num_series > 1)
+        self.series_table.blockSignals(False)
+
+    def series_styles(self):
+        # Style of each series, or None for hidden ones; "Default" follows
+        # the main plot style dropdown
+        styles = []
+        for row in range(self.series_table.rowCount()):
+            if self.series_table.item(row, 0).checkState() != Qt.CheckState.Checked:
+                styles.append(None)
+                continue
+            style = self.series_table.cellWidget(row, 1).currentText()
+            styles.append(self.style_dropdown.currentText() if style == "Default" else style)
+        return styles
 
     def add_row(self):
-        row_position = self.table.rowCount()
-        self.table.insertRow(row_position)
-
-    def format_superscript(self, text):
-        superscript_map = {
-            '0': '⁰', '1': '¹', '2': '²', '3': '³', '4': '⁴', '5': '⁵', '6': '⁶', '7': '⁷', '8': '⁸', '9': '⁹',
-            'a': 'ᵃ', 'b': 'ᵇ', 'c': 'ᶜ', 'd': 'ᵈ', 'e': 'ᵉ', 'f': 'ᶠ', 'g': 'ᵍ', 'h': 'ʰ', 'i': 'ⁱ', 'j': 'ʲ',
-            'k': 'ᵏ', 'l': 'ˡ', 'm': 'ᵐ', 'n': 'ⁿ', 'o': 'ᵒ', 'p': 'ᵖ', 'q': 'q', 'r': 'ʳ', 's': 'ˢ', 't': 'ᵗ',
-            'u': 'ᵘ', 'v': 'ᵛ', 'w': 'ʷ', 'x': 'ˣ', 'y': 'ʸ', 'z': 'ᶻ',
-            'A': 'ᴬ', 'B': 'ᴮ', 'C': 'ᶜ', 'D': 'ᴰ', 'E': 'ᴱ', 'F': 'ᶠ', 'G': 'ᴳ', 'H': 'ᴴ', 'I': 'ᴵ', 'J': 'ᴶ',
-            'K': 'ᴷ', 'L': 'ᴸ', 'M': 'ᴹ', 'N': 'ᴺ', 'O': 'ᴼ', 'P': 'ᴾ', 'Q': 'Q', 'R': 'ᴿ', 'S': 'ˢ', 'T': 'ᵀ',
-            'U': 'ᵁ', 'V': 'ⱽ', 'W': 'ᵂ', 'X': 'ˣ', 'Y': 'ʸ', 'Z': 'ᶻ',
-            '+': '⁺', '-': '⁻', '=': '⁼', '(': '⁽', ')': '⁾', ':': '︓', '>': '˃', '<': '˂', '/': 'ᐟ', '\\': '˂'
-        }
-
-        def replace_superscript(match):
-            exp = match.group(1)
-            if exp.startswith('(') and exp.endswith(')'):
-                exp = exp[1:-1]  # Remove parentheses
-            return ''.join(superscript_map.get(char, char) for char in exp)
-
-        return re.sub(r'\^(-?\d+|\(-?[^()]+\)|[a-zA-Z]+)', replace_superscript, text)
+        self.table_model.add_row()
 
     def get_plot_data(self):
-        x_values = []
-        y_values = []
-
-        for row in range(self.table.rowCount()):
-            try:
-                x_item = self.table.item(row, 0)
-                y_item = self.table.item(row, 1)
-                if x_item and y_item:
-                    x = float(x_item.text())
-                    y = float(y_item.text())
-                    x_values.append(x)
-                    y_values.append(y)
-            except ValueError:
-                print(f"Invalid data in row {row + 1}")
-
-        # Sort the points by x-value, but keep duplicates
-        points = sorted(zip(x_values, y_values), key=lambda p: p[0])
-        return points
+        # Valid points sorted by x-value, but keep duplicates
+        return self.dataset.sorted_arrays()
 
     def plot_data(self):
+        self.stop_follow()
         self.stop_animation()
-
-        points = self.get_plot_data()
-        if len(points) < 2:
+        with profiler.frame('plot_data'):
+            if self.dataset.num_series > 1:
+                self.plot_series()
+                return
+
+            with profiler.stage('sort'):
+                x_values, y_values = self.get_plot_data()
+            if len(x_values) < 2:
+                print("Please enter at least two valid data points")
+                return
+
+            style = self.style_dropdown.currentText()
+            fit = None
+            request = fit_request(x_values, y_values, style, self.interp_dropdown.currentText(),
+                                  self.points_slider.value(), self.poly_degree_spinner.value(),
+                                  self.duplicates_dropdown.currentText())
+            if request is not None:
+                params, compute = request
+                with profiler.stage('fingerprint'):
+                    key = (self.dataset.fingerprint(),) + params
+                with profiler.stage('fit'):
+                    fit = self.request_fit(key, compute, len(x_values))
+
+            if fit is PENDING:
+                # Keep the current plot until the worker delivers the result
+                self.statusBar().showMessage("Computing fit...")
+                return
+            self.compute_runner.cancel('plot')
+            self.has_plot = True
+
+            with profiler.stage('draw artists'):
+                self.ax.clear()
+                draw_plot(self.ax, x_values, y_values, style, fit, plot=self.new_level_of_detail().plot)
+
+            if style == "Polynomial Fit":
+                print(f"Polynomial fit equation: {format_equation(fit.coeffs)}")
+                print(f"R-squared: {fit.r_squared:.4f}")
+
+            self.set_labels()
+            with profiler.stage('canvas.draw'):
+                self.canvas.draw()
+            self.toolbar.update()  # Home goes back to this plot's view
+
+    def plot_series(self):
+        with profiler.stage('sort'):
+            x_values, ys = self.dataset.sorted_series()
+
+        # Series sharing a style are fitted together in one batch, split
+        # further where they have values in different rows
+        groups = {}
+        for i, style in enumerate(self.series_styles()):
+            if style is not None:
+                groups.setdefault(style, []).append(i)
+        visible = [i for indices in groups.values() for i in indices]
+        if len(x_values) < 2 or (visible and np.isfinite(ys[:, visible]).sum(axis=0).max() < 2):
             print("Please enter at least two valid data points")
             return
 
-        x_values, y_values = zip(*points)
+        curves = {}
+        fitted = []
+        pending = False
+        for style, indices in groups.items():
+            for batch, rows in series_batches(ys, indices):
+                batch_x, batch_ys = (x_values, ys[:, batch]) if rows is None else (x_values[rows], ys[rows][:, batch])
+                request = fit_request(batch_x, batch_ys, style, self.interp_dropdown.currentText(),
+                                      self.points_slider.value(), self.poly_degree_spinner.value(),
+                                      self.duplicates_dropdown.currentText())
+                if request is None or len(batch_x) < 2:
+                    continue
+                params, compute = request
+                with profiler.stage('fingerprint'):
+                    key = (self.dataset.fingerprint(),) + params + (tuple(batch),)
+                with profiler.stage(f'fit: {style}'):
+                    fit = self.request_fit(key, compute, len(batch_x) * len(batch), f'plot: {style} {batch}')
+                if fit is PENDING:
+                    pending = True
+                else:
+                    curves.update(fit_curves(style, fit, batch))
+                    fitted.append((style, batch, fit))
+
+        if pending:
+            self.statusBar().showMessage("Computing fit...")
+            return
+        self.compute_runner.cancel('plot')
+        self.has_plot = True
 
-        self.ax.clear()
+        with profiler.stage('draw artists'):
+            self.ax.clear()
+            draw_series(self.ax, x_values, ys, self.dataset.series_names, groups, curves, self.new_level_of_detail())
 
-        if self.style_dropdown.currentText() == "Connecting Lines":
-            self.ax.plot(x_values, y_values, 'bo-')
-        elif self.style_dropdown.currentText() == "Smooth Curve":
-            num_points = self.points_slider.value()
-            x_new = np.linspace(min(x_values), max(x_values), num_points)
-            interp_method = self.interp_dropdown.currentText()
-
-            if len(set(x_values)) > 3 or interp_method != 'cubic':
-                if len(set(x_values)) == len(x_values):  # No duplicates
-                    f = interpolate.interp1d(x_values, y_values, kind=interp_method)
-                else:  # Handle duplicates
-                    f = interpolate.UnivariateSpline(x_values, y_values, k=min(3, len(set(x_values)) - 1))
-                y_smooth = f(x_new)
-                self.ax.plot(x_new, y_smooth, 'b-')
-            else:
-                self.ax.plot(x_values, y_values, 'b-')  # Fallback to simple line if cubic is not possible
-
-            self.ax.plot(x_values, y_values, 'bo')  # Add original points
-        elif self.style_dropdown.currentText() == "Polynomial Fit":
-            degree = self.poly_degree_spinner.value()
-            coeffs = np.polyfit(x_values, y_values, degree)
-            p = np.poly1d(coeffs)
-
-            x_new = np.linspace(min(x_values), max(x_values), 100)
-            y_new = p(x_new)
-
-            self.ax.plot(x_values, y_values, 'bo', label='Data Points')
-            self.ax.plot(x_new, y_new, 'r-', label=f'Polynomial Fit (degree {degree})')
-            self.ax.legend()
-
-            # Calculate and display R-squared
-            y_pred = p(x_values)
-            r_squared = 1 - (np.sum((np.array(y_values) - y_pred) ** 2) / np.sum(
-                (np.array(y_values) - np.mean(y_values)) ** 2))
-            self.ax.set_title(f'Polynomial Fit (R² = {r_squared:.4f})')
-
-            # Print equation
-            eq = f"y = {coeffs[0]:.4f}"
-            for i, coeff in enumerate(coeffs[1:], 1):
-                eq += f" + {coeff:.4f}x^{degree - i}"
-            print(f"Polynomial fit equation: {eq}")
-            print(f"R-squared: {r_squared:.4f}")
+        for style, batch, fit in fitted:
+            if style == "Polynomial Fit":
+                for j, i in enumerate(batch):
+                    print(f"{self.dataset.series_names[i]}: {format_equation(fit.coeffs[:, j])} "
+                          f"(R-squared: {fit.r_squared[j]:.4f})")
 
         self.set_labels()
-        self.canvas.draw()
+        with profiler.stage('canvas.draw'):
+            self.canvas.draw()
+        self.toolbar.update()
+
+    def active_level_of_detail(self):
+        # Only while the table's data is plotted through it, not animated or followed
+        if self.has_plot and self.animation is None and self.follow_timer is None:
+            return self.level_of_detail
+        return None
+
+    def canvas_resized(self, event):
+        if self.active_level_of_detail() is not None:
+            self.level_of_detail.refine()
+
+    def request_fit(self, key, compute, size, channel='plot'):
+        # Cached results and small fits are returned directly. Anything else is
+        # computed on the worker pool and the plot is redrawn when it arrives.
+        if key in self.fit_cache or size < BACKGROUND_THRESHOLD or not self.compute_in_background:
+            return self.fit_cache.get(key, compute)
+        self.compute_runner.submit(channel, key, compute)
+        return PENDING
+
+    def fit_computed(self, channel, key, result):
+        self.fit_cache.put(key, result)
+        self.statusBar().clearMessage()
+        # Kept for later while animating or following instead of replotting over them
+        if self.animation is None and self.follow_timer is None:
+            self.plot_data()
+
+    def fit_failed(self, channel, key, message):
+        self.statusBar().clearMessage()
+        print(f"Fit failed: {message}")
+
+    def parameters_changed(self):
+        # Refit live once something has been plotted
+        if self.has_plot and self.animation is None and self.follow_timer is None:
+            self.plot_data()
+
+    def new_level_of_detail(self):
+        # Decimated lines are refined from the full data on every zoom or pan
+        method = DECIMATION_METHODS[self.decimation_dropdown.currentText()]
+        self.level_of_detail = LevelOfDetail(self.ax, method)
+        return self.level_of_detail
 
     def set_labels(self):
-        x_label = self.x_axis_input.text() or 'X'
-        y_label = self.y_axis_input.text() or 'Y'
-
-        if self.latex_checkbox.isChecked():
-            try:
-                matplotlib.rcParams['text.usetex'] = True
-                matplotlib.rcParams['font.family'] = 'serif'
-                self.ax.set_xlabel(f'${x_label}$')
-                self.ax.set_ylabel(f'${y_label}$')
-                self.ax.set_title(f'${self.graph_title}$')
-            except Exception as e:
-                print(f"LaTeX rendering failed: {e}")
-                print("Falling back to standard text rendering with superscript formatting")
-                matplotlib.rcParams['text.usetex'] = False
-                self.ax.set_xlabel(self.format_superscript(x_label))
-                self.ax.set_ylabel(self.format_superscript(y_label))
-                self.ax.set_title(self.format_superscript(self.graph_title))
-        else:
-            matplotlib.rcParams['text.usetex'] = False
-            self.ax.set_xlabel(self.format_superscript(x_label))
-            self.ax.set_ylabel(self.format_superscript(y_label))
-            self.ax.set_title(self.format_superscript(self.graph_title))
+        with profiler.stage('labels'):
+            self.label_renderer.apply(self.ax, self.x_axis_input.text() or 'X', self.y_axis_input.text() or 'Y',
+                                      self.graph_title, self.latex_checkbox.isChecked())
 
     def animate(self, i):
-        points = self.get_plot_data()[:i + 1]
-        if len(points) < 2:
-            return
-        x_values, y_values = zip(*points)
-
-        self.ax.clear()
-        if self.style_dropdown.currentText() == "Connecting Lines":
-            self.ax.plot(x_values, y_values, 'bo-')
-        else:  # Smooth Curve
-            if len(set(x_values)) > 3:  # Need at least 4 unique points for cubic interpolation
-                if len(set(x_values)) == len(x_values):  # No duplicates
-                    f = interpolate.interp1d(x_values, y_values, kind='cubic')
-                else:  # Handle duplicates
-                    f = interpolate.UnivariateSpline(x_values, y_values, k=min(3, len(set(x_values)) - 1))
-                x_new = np.linspace(min(x_values), max(x_values), 300)
-                y_smooth = f(x_new)
-                self.ax.plot(x_new, y_smooth, 'b-')
-            self.ax.plot(x_values, y_values, 'bo')  # Add original points
-
-        self.set_labels()
-
-        # Set consistent axis limits
-        all_x, all_y = zip(*self.get_plot_data())
-        self.ax.set_xlim(min(all_x), max(all_x))
-        self.ax.set_ylim(min(all_y), max(all_y))
+        return self.animator.frame(i)
 
     def toggle_animation(self):
         if self.animation is None:
@@ -404,35 +786,376 @@ class PlotterApp(QMainWindow):
             self.stop_animation()
 
     def start_animation(self):
-        points = self.get_plot_data()
-        if len(points) < 2:
+        # Snapshot the data once; frames only update the existing artists.
+        # The animation module is only loaded the first time this runs.
+        from animator import PlotAnimator
+
+        self.stop_follow()
+        x_values, y_values = self.get_plot_data()
+        if len(x_values) < 2:
             print("Please enter at least two valid data points")
             return
 
-        self.animation = FuncAnimation(self.figure, self.animate, frames=len(points),
-                                       interval=self.animation_speed, repeat=True)
+        # A fit finishing now would replot the table and stop the animation
+        self.compute_runner.cancel_all()
+        self.statusBar().clearMessage()
+        self.ax.clear()
+        curve = None
+        if self.style_dropdown.currentText() != "Connecting Lines":
+            duplicates = self.duplicates_dropdown.currentText()
+            curve = self.fit_cache.get((self.dataset.fingerprint(), 'smooth', 'cubic', 300, duplicates),
+                                       lambda: smooth_curve(x_values, y_values, 'cubic', 300, duplicates))
+        self.animator = PlotAnimator(self.ax, x_values, y_values,
+                                     smooth=self.style_dropdown.currentText() != "Connecting Lines", curve=curve,
+                                     stride=self.stride_spinner.value(),
+                                     method=DECIMATION_METHODS[self.decimation_dropdown.currentText()])
+        self.set_labels()
+        self.animation = self.animator.start(self.animation_speed)
         self.canvas.draw()
         self.animate_button.setText('Stop Animation')
 
     def stop_animation(self):
         if self.animation:
-            self.animation.event_source.stop()
+            self.animator.stop()
             self.animation = None
             self.plot_data()  # Redraw the full plot
             self.animate_button.setText('Animate Plot')
 
+    def export_animation(self):
+        # The frames are rendered off-screen in worker processes, so the
+        # window and any running animation are left alone
+        from animation_export import AnimationExportWorker, make_spec, mp4_available
+
+        x_values, y_values = self.get_plot_data()
+        if len(x_values) < 2:
+            print("Please enter at least two valid data points")
+            return
+        filters = "GIF Files (*.gif)" + (";;MP4 Files (*.mp4)" if mp4_available() else "")
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Export Animation", "", filters)
+        if not file_path:
+            return
+        if not file_path.lower().endswith(('.gif', '.mp4')):
+            file_path += '.mp4' if selected_filter.startswith("MP4") else '.gif'
+        stride, ok = QInputDialog.getInt(self, "Export Animation", "Points per frame:",
+                                         self.stride_spinner.value(), 1, len(x_values))
+        if not ok:
+            return
+        fps, ok = QInputDialog.getInt(self, "Export Animation", "Frames per second:",
+                                      max(round(1000 / self.animation_speed), 1), 1, 60)
+        if not ok:
+            return
+        # The height follows from the width and the window's aspect ratio
+        width_inches, height_inches = self.figure.get_size_inches()
+        dpi = self.figure.dpi
+        width, ok = QInputDialog.getInt(self, "Export Animation", "Width in pixels:",
+                                        round(width_inches * dpi), 100, 4000)
+        if not ok:
+            return
+
+        smooth = self.style_dropdown.currentText() != "Connecting Lines"
+        duplicates = self.duplicates_dropdown.currentText()
+        curve = None
+        if smooth:
+            curve = self.fit_cache.get((self.dataset.fingerprint(), 'smooth', 'cubic', 300, duplicates),
+                                       lambda: smooth_curve(x_values, y_values, 'cubic', 300, duplicates))
+        spec = make_spec(x_values, y_values, smooth, stride, DECIMATION_METHODS[self.decimation_dropdown.currentText()],
+                         self.x_axis_input.text() or 'X', self.y_axis_input.text() or 'Y', self.graph_title,
+                         self.latex_checkbox.isChecked(), width / dpi, width / dpi * height_inches / width_inches,
+                         dpi, duplicates, curve)
+
+        self.export_progress = self.new_progress_dialog("Export Animation", "Rendering frames...")
+        self.animation_export_worker = AnimationExportWorker(file_path, spec, fps, self)
+        self.animation_export_worker.progress.connect(self.update_export_progress)
+        self.animation_export_worker.exported.connect(
+            lambda stats: self.statusBar().showMessage(
+                f"Exported {stats['frames']} frames to {file_path} ({stats['bytes'] / 1e6:.1f} MB) "
+                f"in {stats['seconds']:.1f}s"))
+        self.animation_export_worker.failed.connect(
+            lambda message: QMessageBox.warning(self, "Export Failed", f"Could not export the animation:\n{message}"))
+        self.animation_export_worker.cancelled.connect(lambda: print("Export cancelled"))
+        self.animation_export_worker.finished.connect(self.export_progress.reset)
+        self.export_progress.canceled.connect(self.animation_export_worker.cancel)
+        self.animation_export_worker.start()
+
+    def update_export_progress(self, done, total):
+        self.export_progress.setValue(done * 100 // max(total, 1))
+        self.export_progress.setLabelText(f"Rendered {done:,} of {total:,} frames")
+
     def update_animation_speed(self, value):
         self.animation_speed = value
         if self.animation:
-            self.animation.event_source.interval = self.animation_speed
+            self.animation.interval = self.animation_speed
+
+    def toggle_follow(self):
+        if self.follow_timer is None:
+            self.start_follow()
+        else:
+            self.stop_follow()
+
+    def start_follow(self):
+        self.follow_action.setChecked(False)
+        file_path, _ = QFileDialog.getOpenFileName(self, "Follow File", "", "CSV Files (*.csv)")
+        if not file_path:
+            return
+        capacity, ok = QInputDialog.getInt(self, "Follow File", "Points to keep:", 100000, 100, 100000000)
+        if not ok:
+            return
+        max_fps, ok = QInputDialog.getInt(self, "Follow File", "Maximum frames per second:", 10, 1, 60)
+        if not ok:
+            return
+
+        self.stop_animation()
+        # A fit finishing now would replot the table and end following
+        self.compute_runner.cancel_all()
+        self.statusBar().clearMessage()
+        self.has_plot = False
+        self.follow_tailer = FileTailer(file_path)
+        self.follow_buffer = RingBuffer(capacity)
+        self.ax.clear()
+        self.follow_line, = self.ax.plot([], [], 'b-')
+        self.set_labels()
+
+        # Polling and redrawing share one timer, which caps the frame rate
+        self.follow_timer = QTimer(self)
+        self.follow_timer.timeout.connect(self.follow_tick)
+        self.follow_timer.start(int(1000 / max_fps))
+        self.follow_action.setChecked(True)
+        self.follow_tick()
+
+    def follow_tick(self):
+        try:
+            x_new, y_new = self.follow_tailer.read_new()
+        except OSError as e:
+            print(f"Could not read {self.follow_tailer.file_path}: {e}")
+            return
+        if len(x_new) == 0:
+            return
+        self.follow_buffer.extend(x_new, y_new)
+        if self.follow_tailer.headers and not self.x_axis_input.text():
+            self.x_axis_input.setText(self.follow_tailer.headers[0])
+            self.y_axis_input.setText(self.follow_tailer.headers[1])
+            self.set_labels()
+
+        x_values, y_values = self.follow_buffer.arrays()
+        method = DECIMATION_METHODS[self.decimation_dropdown.currentText()]
+        self.follow_line.set_data(*decimate(x_values, y_values, max(int(self.ax.get_window_extent().width), 100),
+                                            method))
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+        self.statusBar().showMessage(f"Following {self.follow_tailer.file_path}: "
+                                     f"{len(self.follow_buffer):,} points shown, "
+                                     f"{self.follow_buffer.total:,} received")
+
+    def stop_follow(self):
+        if self.follow_timer is None:
+            return
+        self.follow_timer.stop()
+        self.follow_timer = None
+        self.follow_action.setChecked(False)
+        self.statusBar().clearMessage()
+        # Hand the buffered samples to the table so they can be plotted and fitted
+        self.table_model.set_arrays(*self.follow_buffer.arrays())
+        self.update_series_table()
+
+    def toggle_timings(self, checked):
+        profiler.enabled = checked
+        self.timings_label.setVisible(checked)
+        if checked:
+            self.timings_timer.start(250)
+        else:
+            self.timings_timer.stop()
+
+    def update_timings(self):
+        if profiler.last is not self.shown_timings:
+            self.shown_timings = profiler.last
+            self.timings_label.setText(profiler.summary())
+
+    def toggle_trace(self, checked):
+        if checked:
+            profiler.start_recording()
+            self.statusBar().showMessage("Recording trace...", 2000)
+            return
+        profiler.stop_recording()
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Trace", "trace.json", "Trace Files (*.json)")
+        if file_path:
+            try:
+                count = profiler.save_trace(file_path)
+            except OSError as e:
+                QMessageBox.warning(self, "Save Failed", f"Could not save the trace:\n{e}")
+                return
+            print(f"Trace with {count} events saved as {file_path}")
+
+    def visible_range(self):
+        return self.ax.get_xlim() if self.has_plot else None
 
     def open_best_fit_window(self):
-        best_fit_window = BestFitLineWindow(self)
-        best_fit_window.exec()
+        # One non-modal window on the data loaded here, kept between uses
+        if self.best_fit_window is None:
+            self.best_fit_window = BestFitLineWindow(self, self.table_model, self.visible_range)
+        self.best_fit_window.show()
+        self.best_fit_window.raise_()
+        self.best_fit_window.activateWindow()
+        self.best_fit_window.schedule_refit()  # The data may have changed while it was closed
 
 
-class BestFitLineWindow(QDialog):
+class ExcelImportDialog(QDialog):
+    PREVIEW_ROWS = 6
+
+    def __init__(self, file_path, sheet_names, parent=None):
+        # Choose the sheet, whether its first row holds headers, and which
+        # columns are X and the Y series, from a preview of its first rows
+        super().__init__(parent)
+        self.setWindowTitle("Import Excel Data")
+        self.file_path = file_path
+        self.preview = []
+
+        layout = QVBoxLayout(self)
+        sheet_layout = QHBoxLayout()
+        sheet_layout.addWidget(QLabel("Sheet:"))
+        self.sheet_dropdown = QComboBox()
+        self.sheet_dropdown.addItems(sheet_names)
+        self.sheet_dropdown.currentTextChanged.connect(self.load_preview)
+        sheet_layout.addWidget(self.sheet_dropdown)
+        layout.addLayout(sheet_layout)
+
+        self.preview_table = QTableWidget()
+        self.preview_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.preview_table)
+
+        self.headers_checkbox = QCheckBox("First row contains headers")
+        self.headers_checkbox.toggled.connect(self.update_columns)
+        layout.addWidget(self.headers_checkbox)
+
+        x_layout = QHBoxLayout()
+        x_layout.addWidget(QLabel("X column:"))
+        self.x_dropdown = QComboBox()
+        x_layout.addWidget(self.x_dropdown)
+        layout.addLayout(x_layout)
+        layout.addWidget(QLabel("Y columns:"))
+        self.y_list = QListWidget()
+        layout.addWidget(self.y_list)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.load_preview(self.sheet_dropdown.currentText())
+
+    def load_preview(self, sheet):
+        self.preview = read_preview(self.file_path, self.PREVIEW_ROWS, sheet)
+        width = len(self.preview[0]) if self.preview else 0
+        self.preview_table.setRowCount(len(self.preview))
+        self.preview_table.setColumnCount(width)
+        self.preview_table.setHorizontalHeaderLabels([column_letter(i) for i in range(width)])
+        for row, values in enumerate(self.preview):
+            for col, value in enumerate(values):
+                self.preview_table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.headers_checkbox.blockSignals(True)
+        self.headers_checkbox.setChecked(detect_headers(self.preview))
+        self.headers_checkbox.blockSignals(False)
+        self.update_columns()
+
+    def update_columns(self):
+        # The first column is X and every numeric column after it a Y series
+        # unless changed here; text columns would leave no valid rows
+        headers = self.headers()
+        rows = self.preview[1:] if headers else self.preview
+        width = len(self.preview[0]) if self.preview else 0
+        names = [column_letter(i) + (f": {headers[i]}" if headers and headers[i] != '' else "") for i in range(width)]
+        self.x_dropdown.clear()
+        self.x_dropdown.addItems(names)
+        self.y_list.clear()
+        for i, name in enumerate(names):
+            numeric = any(not np.isnan(cell_to_float(row[i])) for row in rows)
+            item = QListWidgetItem(name)
+            item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            item.setCheckState(Qt.CheckState.Checked if i > 0 and numeric else Qt.CheckState.Unchecked)
+            self.y_list.addItem(item)
+
+    def sheet(self):
+        return self.sheet_dropdown.currentText()
+
+    def headers(self):
+        return self.preview[0] if self.preview and self.headers_checkbox.isChecked() else None
+
+    def columns(self):
+        # Indexes of the X column followed by the Y columns
+        x_column = self.x_dropdown.currentIndex()
+        return [x_column] + [i for i in range(self.y_list.count())
+                             if i != x_column and self.y_list.item(i).checkState() == Qt.CheckState.Checked]
+
+    def accept(self):
+        if len(self.columns()) < 2:
+            QMessageBox.warning(self, "Invalid Data", "Please choose an X column and at least one Y column.")
+            return
+        super().accept()
+
+
+class ExportPlotDialog(QDialog):
     def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Plot")
+        layout = QVBoxLayout(self)
+
+        format_layout = QHBoxLayout()
+        format_layout.addWidget(QLabel("Formats:"))
+        self.format_checkboxes = {}
+        for fmt in EXPORT_FORMATS:
+            checkbox = QCheckBox(fmt.upper())
+            checkbox.setChecked(fmt == 'png')
+            format_layout.addWidget(checkbox)
+            self.format_checkboxes[fmt] = checkbox
+        layout.addLayout(format_layout)
+
+        dpi_layout = QHBoxLayout()
+        dpi_layout.addWidget(QLabel("Resolutions (DPI):"))
+        self.dpi_input = QLineEdit("100, 300")
+        dpi_layout.addWidget(self.dpi_input)
+        layout.addLayout(dpi_layout)
+
+        self.rasterize_checkbox = QCheckBox("Rasterize dense data in SVG/PDF")
+        self.rasterize_checkbox.setChecked(True)
+        layout.addWidget(self.rasterize_checkbox)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def formats(self):
+        return [fmt for fmt, checkbox in self.format_checkboxes.items() if checkbox.isChecked()]
+
+    def dpis(self):
+        # Unique values in the order given; None when the text is not valid
+        try:
+            dpis = [int(text) for text in self.dpi_input.text().replace(',', ' ').split()]
+        except ValueError:
+            return None
+        if not dpis or not all(10 <= dpi <= 2400 for dpi in dpis):
+            return None
+        return list(dict.fromkeys(dpis))
+
+    def accept(self):
+        if not self.formats():
+            QMessageBox.warning(self, "Export Plot", "Please choose at least one format.")
+            return
+        if self.dpis() is None:
+            QMessageBox.warning(self, "Export Plot", "Please enter resolutions between 10 and 2400 DPI, "
+                                                     "separated by commas.")
+            return
+        super().accept()
+
+
+class BestFitLineWindow(QDialog):
+    FIT_RANGES = ["All data", "Visible range", "Selected rows"]
+
+    def __init__(self, parent=None, table_model=None, view_range=None):
+        # Given the main window's table model the data is shared, not copied:
+        # edits in either table show up in both and trigger a refit here.
+        # view_range returns the x-range currently shown in the main plot, or
+        # None when nothing has been plotted.
         super().__init__(parent)
         self.setWindowTitle("Best Fit Line Analysis")
         self.setGeometry(200, 200, 800, 600)
@@ -445,10 +1168,19 @@ class BestFitLineWindow(QDialog):
         left_layout = QVBoxLayout(left_panel)
         layout.addWidget(left_panel)
 
-        # Create table for data entry
-        self.table = QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(['X', 'Y'])
+        # Create table for data entry, backed by a columnar dataset
+        self.table_model = table_model or DataTableModel(Dataset())
+        self.dataset = self.table_model.dataset
+        self.view_range = view_range
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         left_layout.addWidget(self.table)
+        self.fit_cache = FitCache(maxsize=8)
+        self.has_fit = False
+        self.compute_in_background = True
+        self.compute_runner = ComputeRunner(self)
+        self.compute_runner.finished.connect(self.fit_computed)
+        self.compute_runner.failed.connect(self.fit_failed)
 
         # Create 'Add Row' button
         add_row_button = QPushButton('Add Row')
@@ -465,81 +1197,236 @@ class BestFitLineWindow(QDialog):
         degree_layout.addWidget(self.degree_spinbox)
         left_layout.addLayout(degree_layout)
 
+        # Automatic degree selection over all degrees in one pass
+        auto_layout = QHBoxLayout()
+        self.auto_degree_checkbox = QCheckBox("Auto degree")
+        auto_layout.addWidget(self.auto_degree_checkbox)
+        auto_layout.addWidget(QLabel('Criterion:'))
+        self.criterion_dropdown = QComboBox()
+        self.criterion_dropdown.addItems(list(CRITERIA))
+        auto_layout.addWidget(self.criterion_dropdown)
+        left_layout.addLayout(auto_layout)
+
+        # Fit everything, the part shown in the main plot, or the rows selected above
+        range_layout = QHBoxLayout()
+        range_layout.addWidget(QLabel('Fit range:'))
+        self.range_dropdown = QComboBox()
+        self.range_dropdown.addItems([fit_range for fit_range in self.FIT_RANGES
+                                      if fit_range != "Visible range" or view_range is not None])
+        self.range_dropdown.currentTextChanged.connect(self.schedule_refit)
+        range_layout.addWidget(self.range_dropdown)
+        left_layout.addLayout(range_layout)
+
+        # Refit shortly after the data changes, once per burst of edits
+        self.refit_timer = QTimer(self)
+        self.refit_timer.setSingleShot(True)
+        self.refit_timer.setInterval(200)
+        self.refit_timer.timeout.connect(self.find_best_fit)
+        self.table_model.dataChanged.connect(self.schedule_refit)
+        self.table_model.rowsInserted.connect(self.schedule_refit)
+        self.table_model.modelReset.connect(self.schedule_refit)
+        self.table.selectionModel().selectionChanged.connect(self.selection_changed)
+
         # Create 'Find Best Fit' button
         fit_button = QPushButton('Find Best Fit')
         fit_button.clicked.connect(self.find_best_fit)
         left_layout.addWidget(fit_button)
 
-        # Right panel for plot display
+        # Comparison of all degrees when auto degree is used
+        self.comparison_table = QTableWidget(0, 5)
+        self.comparison_table.setHorizontalHeaderLabels(['Degree', 'R²', 'Adj. R²', 'AIC', 'LOOCV RMSE'])
+        self.comparison_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.comparison_table.hide()
+        left_layout.addWidget(self.comparison_table)
+
+        # Right panel for plot display; the figure is created on the first fit
         right_panel = QWidget()
-        right_layout = QVBoxLayout(right_panel)
+        self.plot_layout = QVBoxLayout(right_panel)
         layout.addWidget(right_panel)
-
-        # Create matplotlib figure and canvas
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.figure)
-        right_layout.addWidget(self.canvas)
+        self.figure = None
+        self.ax = None
+        self.canvas = None
+        self.level_of_detail = None
 
     def add_row(self):
-        row_position = self.table.rowCount()
-        self.table.insertRow(row_position)
+        self.table_model.add_row()
 
     def get_data(self):
-        x_values = []
-        y_values = []
-
-        for row in range(self.table.rowCount()):
-            try:
-                x_item = self.table.item(row, 0)
-                y_item = self.table.item(row, 1)
-                if x_item and y_item:
-                    x = float(x_item.text())
-                    y = float(y_item.text())
-                    x_values.append(x)
-                    y_values.append(y)
-            except ValueError:
-                print(f"Invalid data in row {row + 1}")
-
-        return np.array(x_values), np.array(y_values)
+        # Slices of the dataset's cached sorted arrays, which the main plot
+        # uses as well; only a row selection copies the rows it picks
+        fit_range = self.range_dropdown.currentText()
+        if fit_range == "Selected rows":
+            ranges = [np.arange(selection.top(), selection.bottom() + 1)
+                      for selection in self.table.selectionModel().selection()]
+            rows = np.unique(np.concatenate(ranges)) if ranges else np.empty(0, dtype=np.intp)
+            x, y = self.dataset.x[rows], self.dataset.y[rows]
+            mask = np.isfinite(x) & np.isfinite(y)
+            # In x order, as the fits and the decimated drawing expect
+            order = np.argsort(x[mask], kind='stable')
+            return x[mask][order], y[mask][order]
+        x, y = self.dataset.sorted_arrays()
+        if fit_range == "Visible range" and self.view_range() is not None:
+            low, high = self.view_range()
+            start, end = np.searchsorted(x, low, 'left'), np.searchsorted(x, high, 'right')
+            return x[start:end], y[start:end]
+        return x, y
+
+    def schedule_refit(self, *args):
+        if self.has_fit and self.isVisible():
+            self.refit_timer.start()
+
+    def selection_changed(self, *args):
+        if self.range_dropdown.currentText() == "Selected rows":
+            self.schedule_refit()
+
+    def fit_computed(self, channel, key, result):
+        self.fit_cache.put(key, result)
+        self.find_best_fit()
+
+    def fit_failed(self, channel, key, message):
+        QMessageBox.warning(self, "Fit Failed", f"Could not fit the data:\n{message}")
 
     def find_best_fit(self):
-        x, y = self.get_data()
-        if len(x) < 2:
-            print("Please enter at least two valid data points")
-            return
-
-        degree = self.degree_spinbox.value()
-        coeffs = np.polyfit(x, y, degree)
-        p = np.poly1d(coeffs)
+        with profiler.frame('find_best_fit'):
+            with profiler.stage('sort'):
+                x, y = self.get_data()
+            if len(x) < 2:
+                print("Please enter at least two valid data points")
+                return
+
+            with profiler.stage('fingerprint'):
+                fingerprint = data_fingerprint(x, y)
+            if self.auto_degree_checkbox.isChecked():
+                # Read here: compute may run on the worker pool, away from the widgets
+                max_degree = self.degree_spinbox.maximum()
+                key = (fingerprint, 'degree-scan', max_degree, 100)
+                compute = lambda: polynomial_degree_scan(x, y, max_degree)
+            else:
+                degree = self.degree_spinbox.value()
+                key = (fingerprint, 'polyfit', degree, 100)
+                compute = lambda: polynomial_fit(x, y, degree)
+
+            if key not in self.fit_cache and len(x) >= BACKGROUND_THRESHOLD and self.compute_in_background:
+                # Fit on the worker pool; find_best_fit runs again once it is cached
+                self.compute_runner.submit('best-fit', key, compute)
+                return
+            self.compute_runner.cancel('best-fit')
+            with profiler.stage('fit'):
+                try:
+                    result = self.fit_cache.get(key, compute)
+                except ValueError as e:
+                    # Too few distinct x-values for any degree, say
+                    self.fit_failed('best-fit', key, str(e))
+                    return
+
+            if self.auto_degree_checkbox.isChecked():
+                best = best_degree_index(result, self.criterion_dropdown.currentText())
+                self.show_degree_scan(result, best)
+                degree, fit = result.degrees[best], result.fits[best]
+                self.degree_spinbox.setValue(degree)
+            else:
+                self.comparison_table.hide()
+                fit = result
+            coeffs, r_squared = fit.coeffs, fit.r_squared
+
+            self.has_fit = True
+
+            # Plot
+            if self.canvas is None:
+                self.create_figure()
+            with profiler.stage('draw artists'):
+                self.ax.clear()
+                # Decimated like the main plot; ax.clear() dropped the previous
+                # level of detail's callback. A fixed legend position avoids
+                # searching every point for the emptiest corner.
+                self.level_of_detail = LevelOfDetail(self.ax)
+                self.level_of_detail.plot(x, y, 'o', color='blue', label='Data Points')
+                self.ax.plot(fit.x_new, fit.y_new, color='red', label=f'Best Fit (degree {degree})')
+                self.ax.legend(loc='upper left')
+            with profiler.stage('labels'):
+                self.ax.set_xlabel('X')
+                self.ax.set_ylabel('Y')
+                self.ax.set_title(f'Best Fit Line (R² = {r_squared:.4f})')
+            with profiler.stage('canvas.draw'):
+                self.canvas.draw()
+
+            print(f"Best fit equation: {format_equation(coeffs)}")
+            print(f"R-squared: {r_squared:.4f}")
 
-        # Calculate R-squared
-        y_pred = p(x)
-        r_squared = 1 - (np.sum((y - y_pred) ** 2) / np.sum((y - np.mean(y)) ** 2))
+    def create_figure(self):
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvas(self.figure)
+        self.plot_layout.addWidget(self.canvas)
+        self.plot_layout.addWidget(NavigationToolbar2QT(self.canvas, self))
+
+    def show_degree_scan(self, scan, best):
+        columns = [scan.r_squared, scan.adjusted_r_squared, scan.aic, scan.cv_rmse]
+        self.comparison_table.setRowCount(len(scan.degrees))
+        for row, degree in enumerate(scan.degrees):
+            values = [str(degree)] + [f"{column[row]:.6g}" for column in columns]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if row == best:
+                    font = item.font()
+                    font.setBold(True)
+                    item.setFont(font)
+                self.comparison_table.setItem(row, col, item)
+        self.comparison_table.show()
+
+class StartupProfiler(QObject):
+    # Waits for the plot canvas to be painted for the first time, prints
+    # where the startup time went and quits. The exit status is 1 when the
+    # first paint misses STARTUP_TARGET.
+    def __init__(self, app, window):
+        super().__init__(window)
+        self.app = app
+        self.window = window
+        self.window_time = None
+        self.exit_code = 0
+        window.canvas.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            # Report once this paint has finished
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        paint_time = time.perf_counter()
+        total = paint_time - start_time
+        print(f"Imports:     {(imports_done_time - start_time) * 1000:8.1f} ms")
+        print(f"Window:      {(self.window_time - imports_done_time) * 1000:8.1f} ms")
+        print(f"First paint: {(paint_time - self.window_time) * 1000:8.1f} ms")
+        print(f"Total:       {total * 1000:8.1f} ms (target {STARTUP_TARGET * 1000:.0f} ms)")
+        loaded = [name for name in LAZY_MODULES if name in sys.modules]
+        if loaded:
+            print(f"Loaded at startup although only needed later: {', '.join(loaded)}")
+        self.exit_code = 0 if total <= STARTUP_TARGET else 1
+        self.app.quit()
 
-        # Plot
-        self.ax.clear()
-        self.ax.scatter(x, y, color='blue', label='Data Points')
-        x_line = np.linspace(min(x), max(x), 100)
-        self.ax.plot(x_line, p(x_line), color='red', label=f'Best Fit (degree {degree})')
-        self.ax.legend()
-        self.ax.set_xlabel('X')
-        self.ax.set_ylabel('Y')
-        self.ax.set_title(f'Best Fit Line (R² = {r_squared:.4f})')
-        self.canvas.draw()
 
-        # Print equation
-        eq = f"y = {coeffs[0]:.4f}"
-        for i, coeff in enumerate(coeffs[1:], 1):
-            eq += f" + {coeff:.4f}x^{degree - i}"
-        print(f"Best fit equation: {eq}")
-        print(f"R-squared: {r_squared:.4f}")
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        from render import main as render_main
+        sys.exit(render_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'animate':
+        from animation_export import main as animate_main
+        sys.exit(animate_main(sys.argv[2:]))
 
+    profile_startup = '--profile-startup' in sys.argv
+    if profile_startup:
+        sys.argv.remove('--profile-startup')
 
-if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = PlotterApp()
+    if profile_startup:
+        startup_profiler = StartupProfiler(app, window)
+        startup_profiler.window_time = time.perf_counter()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    sys.exit(startup_profiler.exit_code if profile_startup else exit_code)
 
 
 
@@ -0,0 +1,108 @@
+import os
+import pickle
+import time
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import Collection
+from matplotlib.lines import Line2D
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from profiling import profiler
+
+EXPORT_FORMATS = ['png', 'svg', 'pdf']
+VECTOR_FORMATS = {'svg', 'pdf'}
+# Data artists with more points than this are embedded as an image in
+# vector files, at the export DPI, while the axes and text stay vectors
+RASTERIZE_THRESHOLD = 5000
+
+
+def artist_points(artist):
+    if isinstance(artist, Line2D):
+        return len(artist.get_xdata())
+    if isinstance(artist, Collection):
+        # Markers of a scatter, or the vertices of every line in a collection
+        return len(artist.get_offsets()) + sum(len(path.vertices) for path in artist.get_paths())
+    return 0
+
+
+def rasterize_dense_artists(figure, threshold=RASTERIZE_THRESHOLD):
+    # Returns how many artists were switched to rasterized drawing
+    count = 0
+    for ax in figure.axes:
+        for artist in list(ax.lines) + list(ax.collections):
+            if not artist.get_rasterized() and artist_points(artist) > threshold:
+                artist.set_rasterized(True)
+                count += 1
+    return count
+
+
+def output_paths(file_path, formats, dpis):
+    # (path, format, dpi) for each file to write. Vector formats are written
+    # once, at the highest DPI for their rasterized layers; with several
+    # DPIs the raster files are told apart by a suffix, e.g. plot_300dpi.png.
+    root = os.path.splitext(file_path)[0]
+    outputs = []
+    for fmt in formats:
+        fmt_dpis = [max(dpis, key=lambda dpi: dpi or 0)] if fmt in VECTOR_FORMATS else dpis
+        for dpi in fmt_dpis:
+            suffix = f"_{dpi}dpi" if len(fmt_dpis) > 1 else ""
+            outputs.append((f"{root}{suffix}.{fmt}", fmt, dpi))
+    return outputs
+
+
+def export_figure(figure, file_path, formats=('png',), dpis=(None,), rasterize=True):
+    # Writes the figure once per format and DPI; a DPI of None keeps the
+    # figure's own. Returns a dict per file with its path, size in bytes
+    # and the seconds it took.
+    if rasterize and VECTOR_FORMATS.intersection(formats):
+        rasterize_dense_artists(figure)
+    results = []
+    for path, fmt, dpi in output_paths(file_path, formats, list(dpis)):
+        start = time.perf_counter()
+        with profiler.stage(f'export {fmt}'):
+            figure.savefig(path, format=fmt, dpi=dpi or 'figure', bbox_inches='tight')
+        results.append({'path': path, 'format': fmt, 'dpi': dpi, 'bytes': os.path.getsize(path),
+                        'seconds': time.perf_counter() - start})
+    return results
+
+
+def format_size(num_bytes):
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+def export_report(results):
+    # e.g. "plot.png 84.2 KB in 0.31s, plot.svg 1.2 MB in 0.95s"
+    return ", ".join(f"{os.path.basename(result['path'])} {format_size(result['bytes'])} in {result['seconds']:.2f}s"
+                     for result in results)
+
+
+class PlotExportWorker(QThread):
+    # Exports a snapshot of a figure on a worker thread. The figure is
+    # pickled when the worker is created, on the GUI thread, so the window
+    # can keep changing the original while the copy is drawn on Agg here.
+    exported = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, figure, file_path, formats=('png',), dpis=(None,), rasterize=True, parent=None):
+        super().__init__(parent)
+        self.snapshot = pickle.dumps(figure)
+        self.file_path = file_path
+        self.formats = list(formats)
+        self.dpis = list(dpis)
+        self.rasterize = rasterize
+
+    def run(self):
+        try:
+            figure = pickle.loads(self.snapshot)
+            FigureCanvasAgg(figure)
+            results = export_figure(figure, self.file_path, self.formats, self.dpis, self.rasterize)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.exported.emit(results)
+        finally:
+            self.snapshot = None
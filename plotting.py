@@ -0,0 +1,96 @@
+import numpy as np
+from matplotlib.lines import Line2D
+
+from fitting import SMOOTHERS, polynomial_fit, smooth_curve
+
+STYLES = ["Connecting Lines", "Smooth Curve", "Polynomial Fit"]
+INTERPOLATION_KINDS = ["linear", "quadratic", "cubic"] + list(SMOOTHERS)
+
+
+def fit_request(x_values, y_values, style, interp_method, num_points, degree, duplicates='mean'):
+    # Describes the numerical work a style needs as (parameters, compute),
+    # or None when the style draws the data as-is. The parameters identify
+    # the result for caching together with the data fingerprint.
+    if style == "Smooth Curve":
+        return (('smooth', interp_method, num_points, duplicates),
+                lambda: smooth_curve(x_values, y_values, interp_method, num_points, duplicates))
+    if style == "Polynomial Fit":
+        return ('polyfit', degree, 100), lambda: polynomial_fit(x_values, y_values, degree)
+    return None
+
+
+def draw_plot(ax, x_values, y_values, style, fit, plot=None):
+    # Draws the data and its fit onto a cleared axes. plot defaults to
+    # ax.plot and can be swapped for a decimating equivalent.
+    plot = plot or ax.plot
+    if style == "Connecting Lines":
+        plot(x_values, y_values, 'bo-')
+    elif style == "Smooth Curve":
+        if fit is not None:
+            plot(*fit, 'b-')
+        else:
+            plot(x_values, y_values, 'b-')  # Fallback to simple line if interpolation is not possible
+
+        plot(x_values, y_values, 'bo')  # Add original points
+    elif style == "Polynomial Fit":
+        degree = len(fit.coeffs) - 1
+        plot(x_values, y_values, 'bo', label='Data Points')
+        ax.plot(fit.x_new, fit.y_new, 'r-', label=f'Polynomial Fit (degree {degree})')
+        ax.legend()
+
+        # Display R-squared
+        ax.set_title(f'Polynomial Fit (R² = {fit.r_squared:.4f})')
+
+
+def series_batches(ys, indices):
+    # Groups the series in indices by the rows they have values in, as
+    # (series indices, row mask) pairs, so each group can be fitted in one
+    # batch on exactly its rows. The mask is None when no values are missing.
+    valid = np.isfinite(ys[:, indices])
+    if valid.all():
+        return [(list(indices), None)]
+    batches = {}
+    for j, i in enumerate(indices):
+        batches.setdefault(valid[:, j].tobytes(), (valid[:, j], []))[1].append(i)
+    return [(batch, rows) for rows, batch in batches.values()]
+
+
+def fit_curves(style, fit, batch):
+    # The curve of each series in a batch fitted together, by series index;
+    # None when the series should be drawn as a simple line instead
+    if fit is None:
+        return {i: None for i in batch}
+    if style == "Smooth Curve":
+        return {i: (fit[0], fit[1][:, j]) for j, i in enumerate(batch)}
+    return {i: (fit.x_new, fit.y_new[:, j]) for j, i in enumerate(batch)}
+
+
+def draw_series(ax, x_values, ys, names, groups, curves, lod):
+    # Draws several series sharing x_values with a fixed number of artists:
+    # one LineCollection for data lines and fitted curves and one scatter for
+    # the markers, however many series there are. groups maps each style to
+    # the indices of the visible series using it; curves maps the index of
+    # each fitted series to its curve. Missing values of a series are left
+    # out of its points.
+    colors = [f'C{i % 10}' for i in range(len(names))]
+    lines, line_colors, markers, marker_colors = [], [], [], []
+    for style, indices in groups.items():
+        for i in indices:
+            valid = np.isfinite(ys[:, i])
+            points = (x_values, ys[:, i]) if valid.all() else (x_values[valid], ys[valid, i])
+            if style == "Connecting Lines" or curves.get(i) is None:
+                # Fallback to simple line if there is no fitted curve
+                lines.append(points)
+            else:
+                lines.append(curves[i])
+            line_colors.append(colors[i])
+            markers.append(points)
+            marker_colors.append(colors[i])
+
+    if lines:
+        lod.add_lines(lines, line_colors)
+    if markers:
+        lod.add_markers(markers, marker_colors, s=16)
+    visible = sorted(i for indices in groups.values() for i in indices)
+    ax.legend(handles=[Line2D([], [], color=colors[i], marker='o', label=names[i]) for i in visible],
+              ncol=1 + len(visible) // 12, fontsize='small')
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Profiler:
+    # Times the stages of a frame: one plot, animation frame or fit. The
+    # breakdown of the last finished frame is kept for the timings readout,
+    # and while recording every frame and stage is also kept as a Chrome
+    # trace event. Stages that run on worker threads are traced on their own
+    # thread but are not part of a frame. With neither the readout nor
+    # recording switched on, frames and stages are not timed at all.
+    def __init__(self):
+        self.enabled = False
+        self.recording = False
+        self.last = None  # (frame name, seconds, [(depth, stage name, seconds), ...])
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    @property
+    def active(self):
+        return self.enabled or self.recording
+
+    @contextmanager
+    def frame(self, name):
+        # A frame started inside another one (plot_data called while
+        # stopping an animation, say) is timed as a stage of the outer frame
+        if not self.active or getattr(self._local, 'stages', None) is not None:
+            with self.stage(name):
+                yield
+            return
+        stages = self._local.stages = []
+        self._local.depth = 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._local.stages = None
+            self._trace(name, start, end)
+            self.last = (name, end - start, stages)
+
+    @contextmanager
+    def stage(self, name):
+        if not self.active:
+            yield
+            return
+        stages = getattr(self._local, 'stages', None)
+        if stages is not None:
+            # Reserve the slot now so nested stages are listed after their parent
+            index = len(stages)
+            stages.append(None)
+            self._local.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            if stages is not None:
+                self._local.depth -= 1
+                stages[index] = (self._local.depth, name, end - start)
+            self._trace(name, start, end)
+
+    def _trace(self, name, start, end):
+        if not self.recording:
+            return
+        event = {'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                 'ts': (start - self._origin) * 1e6, 'dur': (end - start) * 1e6}
+        with self._lock:
+            self.events.append(event)
+
+    def start_recording(self):
+        with self._lock:
+            self.events = []
+        self.recording = True
+
+    def stop_recording(self):
+        self.recording = False
+
+    def save_trace(self, file_path):
+        # Trace-event JSON as read by chrome://tracing and Perfetto
+        with self._lock:
+            events = list(self.events)
+        threads = {event['tid'] for event in events}
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                     'args': {'name': names.get(tid, f'Thread {tid}')}} for tid in sorted(threads)]
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+    def summary(self):
+        # One line for the status bar, e.g.
+        # "plot_data 84.1 ms: sort 2.0, fit 61.3 (interp1d 40.2, evaluate 21.0), canvas.draw 19.8"
+        if self.last is None:
+            return ""
+        name, total, stages = self.last
+        text = ""
+        depth = 0
+        for stage in stages:
+            if stage is None:  # Still running when the frame ended
+                continue
+            stage_depth, stage_name, seconds = stage
+            if stage_depth > depth:
+                text += " ("
+            else:
+                text += ")" * (depth - stage_depth) + (", " if text else "")
+            text += f"{stage_name} {seconds * 1000:.1f}"
+            depth = stage_depth
+        text += ")" * depth
+        return f"{name} {total * 1000:.1f} ms" + (f": {text}" if text else "")
+
+
+# Shared by the GUI, the fitting code and the worker threads
+profiler = Profiler()
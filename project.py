@@ -0,0 +1,118 @@
+import json
+import os
+import struct
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+
+from fitting import PolynomialFit
+
+PROJECT_EXTENSION = '.plotproj'
+PROJECT_VERSION = 2
+
+Project = namedtuple('Project', ['x', 'ys', 'series_names', 'order', 'fingerprint', 'settings', 'fits'])
+
+
+# A project is an .npz archive: the dataset columns, the permutation that
+# sorts them by x (only when they are not in order already), every cached fit
+# of the current data, and a JSON string with the window settings. Saved
+# uncompressed, the data columns are memory-mapped straight out of the
+# archive on load rather than read into memory.
+
+def save_project(file_path, dataset, settings, fits, compress=True):
+    # fits is a list of (key, value) pairs from a FitCache; only those for
+    # the current data are kept
+    fingerprint = dataset.fingerprint()
+    arrays = {'x': dataset.x, 'ys': dataset.ys}
+    order = dataset.sort_order()
+    if len(order) != len(dataset) or np.any(order[1:] < order[:-1]):
+        arrays['order'] = order
+
+    saved_fits = []
+    for key, value in fits:
+        if key[0] != fingerprint:
+            continue
+        i = len(saved_fits)
+        if value is None:
+            kind = 'none'
+        elif isinstance(value, PolynomialFit):
+            kind = 'polyfit'
+            for field in PolynomialFit._fields:
+                arrays[f'fit{i}_{field}'] = np.asarray(getattr(value, field))
+        else:
+            kind = 'curve'
+            arrays[f'fit{i}_x'], arrays[f'fit{i}_y'] = value
+        saved_fits.append({'key': list(key), 'kind': kind})
+
+    header = {
+        'version': PROJECT_VERSION,
+        'series_names': dataset.series_names,
+        'fingerprint': fingerprint,
+        'fits': saved_fits,
+        'settings': settings,
+    }
+    arrays['project'] = np.array(json.dumps(header))
+    # Written next to the target and then renamed over it, since the data
+    # being saved may be memory-mapped from the file it replaces. An open
+    # file also keeps numpy from appending .npz to the name.
+    temp_path = file_path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            (np.savez_compressed if compress else np.savez)(f, **arrays)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_project(file_path):
+    with np.load(file_path) as archive:
+        header = json.loads(str(archive['project']))
+        if header.get('version', 0) > PROJECT_VERSION:
+            raise ValueError("The project was saved by a newer version of this program")
+        x, ys = load_column(file_path, archive, 'x'), load_column(file_path, archive, 'ys')
+        order = archive['order'] if 'order' in archive.files else None
+        fingerprint = header['fingerprint']
+        if header.get('version', 0) < 2:
+            # Saved when rows missing any series were dropped, so the order
+            # and fingerprint do not match how the data is sorted now
+            order, fingerprint = None, None
+
+        fits = []
+        for i, fit in enumerate(header['fits']):
+            key = tuple(tuple(part) if isinstance(part, list) else part for part in fit['key'])
+            if fit['kind'] == 'none':
+                value = None
+            elif fit['kind'] == 'polyfit':
+                value = PolynomialFit(*(archive[f'fit{i}_{field}'][()] for field in PolynomialFit._fields))
+            else:
+                value = (archive[f'fit{i}_x'], archive[f'fit{i}_y'])
+            fits.append((key, value))
+    return Project(x, ys, header['series_names'], order, fingerprint, header['settings'], fits)
+
+
+def load_column(file_path, archive, name):
+    # Memory-maps an uncompressed member copy-on-write, so edits stay in
+    # memory; compressed members are read in full.
+    info = archive.zip.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return archive[name]
+    with open(file_path, 'rb') as f:
+        # The member's data follows its 30-byte local header, name and extra field
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack('<HH', f.read(4))
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            return archive[name]
+        offset = f.tell()
+    if dtype.hasobject or 0 in shape:
+        return archive[name]
+    return np.memmap(file_path, dtype=dtype, mode='c', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
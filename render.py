@@ -0,0 +1,165 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from decimation import METHODS as DECIMATION_METHODS, LevelOfDetail
+from importers import detect_headers, load_csv, load_xlsx, read_preview
+from labels import LabelRenderer
+from fitting import AGGREGATIONS
+from plotting import INTERPOLATION_KINDS, STYLES, draw_plot, draw_series, fit_curves, fit_request, series_batches
+from plot_export import EXPORT_FORMATS, export_figure
+
+INPUT_EXTENSIONS = ('.csv', '.xlsx')
+
+# One per worker process, so the TeX check and label cache are shared by its files
+label_renderer = LabelRenderer()
+
+
+def collect_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(INPUT_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def read_input(file_path, sheet=None):
+    # Loads every column of a CSV/XLSX file, taking a first row that is not
+    # numeric as headers, and returns the rows with x and at least one Y
+    # value sorted by x, along with the preview rows and whether they start
+    # with headers. Missing Y values stay NaN.
+    preview = read_preview(file_path, sheet=sheet)
+    has_headers = detect_headers(preview)
+    skip_rows, columns = 1 if has_headers else 0, max(len(preview[0]), 2)
+    if file_path.endswith('.xlsx'):
+        x_values, ys = load_xlsx(file_path, skip_rows, columns=columns, sheet=sheet)
+    else:
+        x_values, ys = load_csv(file_path, skip_rows, columns=columns)
+    mask = np.isfinite(x_values) & np.isfinite(ys).any(axis=1)
+    order = np.argsort(x_values[mask], kind='stable')
+    x_values, ys = x_values[mask][order], ys[mask][order]
+    if len(x_values) < 2:
+        raise ValueError("at least two valid data points are needed")
+    return x_values, ys, preview, has_headers
+
+
+def render_file(file_path, out_dir, options):
+    # Renders one input file to each of the formats on the Agg backend,
+    # using the same fit and drawing code as the GUI. Returns the per-stage
+    # timings.
+    timings = {'file': file_path}
+    start = time.perf_counter()
+    try:
+        x_values, ys, preview, has_headers = read_input(file_path, options['sheet'])
+        timings['rows'] = len(x_values)
+        timings['load'] = time.perf_counter() - start
+
+        # Multi-column files are fitted in one batch per set of series with
+        # values in the same rows
+        stage = time.perf_counter()
+        single = ys.shape[1] == 1
+        fit = None
+        curves = {}
+        for batch, rows in series_batches(ys, list(range(ys.shape[1]))):
+            batch_x, batch_ys = (x_values, ys[:, batch]) if rows is None else (x_values[rows], ys[rows][:, batch])
+            request = fit_request(batch_x, batch_ys[:, 0] if single else batch_ys, options['style'],
+                                  options['interp'], options['points'], options['degree'], options['duplicates'])
+            if request is not None and len(batch_x) >= 2:
+                fit = request[1]()
+                curves.update(fit_curves(options['style'], fit, batch))
+        timings['fit'] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        figure = Figure(figsize=(options['width'], options['height']), dpi=options['dpi'])
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+        lod = LevelOfDetail(ax, DECIMATION_METHODS[options['decimation']])
+        if single:
+            draw_plot(ax, x_values, ys[:, 0], options['style'], fit, plot=lod.plot)
+        else:
+            names = ([str(name) for name in preview[0][1:]] if has_headers
+                     else [f'Y{i + 1}' for i in range(ys.shape[1])])
+            draw_series(ax, x_values, ys, names, {options['style']: list(range(ys.shape[1]))}, curves, lod)
+        # The view is fixed, so there is nothing to refine on zoom
+        lod.detach()
+        x_label = options['xlabel'] or (str(preview[0][0]) if has_headers else 'X')
+        y_label = options['ylabel'] or (str(preview[0][1]) if has_headers and single else 'Y')
+        label_renderer.apply(ax, x_label, y_label, options['title'], options['latex'])
+        timings['draw'] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        output = os.path.join(out_dir, os.path.splitext(os.path.basename(file_path))[0])
+        timings['output'] = [result['path'] for result in export_figure(figure, output, options['formats'])]
+        timings['save'] = time.perf_counter() - stage
+    except Exception as e:
+        timings['error'] = str(e)
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+
+def print_summary(results, wall_time):
+    print(f"{'file':<40} {'rows':>10} {'load':>8} {'fit':>8} {'draw':>8} {'save':>8} {'total':>8}")
+    for result in results:
+        name = os.path.basename(result['file'])
+        if 'error' in result:
+            print(f"{name:<40} FAILED: {result['error']}")
+            continue
+        print(f"{name:<40} {result['rows']:>10} {result['load']:>8.3f} {result['fit']:>8.3f} "
+              f"{result['draw']:>8.3f} {result['save']:>8.3f} {result['total']:>8.3f}")
+    failed = sum('error' in result for result in results)
+    print(f"Rendered {len(results) - failed} of {len(results)} files in {wall_time:.2f}s "
+          f"({sum(result['total'] for result in results):.2f}s of work)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='main.py render',
+                                     description="Render plots to PNG, SVG or PDF without the GUI.")
+    parser.add_argument('--input', nargs='+', required=True, help="CSV/XLSX files or directories containing them")
+    parser.add_argument('--out', required=True, help="Output directory")
+    parser.add_argument('--sheet', help="Sheet to read from XLSX files (the first by default)")
+    parser.add_argument('--style', choices=STYLES, default=STYLES[0])
+    parser.add_argument('--interp', choices=INTERPOLATION_KINDS, default='linear')
+    parser.add_argument('--points', type=int, default=1000, help="Interpolation points for Smooth Curve")
+    parser.add_argument('--duplicates', choices=AGGREGATIONS, default='mean',
+                        help="How repeated x-values are combined for Smooth Curve")
+    parser.add_argument('--degree', type=int, default=1, help="Degree for Polynomial Fit")
+    parser.add_argument('--title', default="Line Plot")
+    parser.add_argument('--xlabel', default='')
+    parser.add_argument('--ylabel', default='')
+    parser.add_argument('--latex', action='store_true')
+    parser.add_argument('--decimation', choices=list(DECIMATION_METHODS), default="Min/Max")
+    parser.add_argument('--width', type=float, default=6.4, help="Figure width in inches")
+    parser.add_argument('--height', type=float, default=4.8, help="Figure height in inches")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--formats', type=lambda text: text.lower().split(','), default=['png'],
+                        help=f"Comma-separated output formats out of {','.join(EXPORT_FORMATS)}")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="Worker processes")
+    args = parser.parse_args(argv)
+    if not set(args.formats) <= set(EXPORT_FORMATS):
+        parser.error(f"--formats must be chosen from {','.join(EXPORT_FORMATS)}")
+
+    files = collect_inputs(args.input)
+    if not files:
+        print("No input files found")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    options = {key: value for key, value in vars(args).items() if key not in ('input', 'out', 'jobs')}
+
+    start = time.perf_counter()
+    jobs = max(1, min(args.jobs or 1, len(files)))
+    if jobs == 1:
+        results = [render_file(file_path, args.out, options) for file_path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_file, file_path, args.out, options) for file_path in files]
+            results = [future.result() for future in futures]
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any('error' in result for result in results) else 0
@@ -0,0 +1,175 @@
+import io
+import os
+
+import time
+
+import numpy as np
+from PyQt6.QtCore import pyqtSignal
+
+from decimation import minmax_indices
+from fitting import StreamingPolynomialFit
+from importers import ImportCancelled, ImportWorker, detect_headers, iter_csv_chunks, read_preview, to_float_columns
+
+# Points kept for drawing a file that is fitted without loading it
+REDUCED_POINTS = 20_000
+
+
+class RingBuffer:
+    # Fixed-capacity x/y buffer that keeps the newest samples. Every sample is
+    # written twice, capacity apart, so the current contents are always one
+    # contiguous slice and arrays() never has to copy.
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._x = np.empty(2 * self.capacity)
+        self._y = np.empty(2 * self.capacity)
+        self._start = 0
+        self._size = 0
+        self.total = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, x, y):
+        self.total += len(x)
+        # Only the newest capacity samples can survive
+        x = np.asarray(x, dtype=np.float64)[-self.capacity:]
+        y = np.asarray(y, dtype=np.float64)[-self.capacity:]
+        n = len(x)
+        if n == 0:
+            return
+        positions = (self._start + self._size + np.arange(n)) % self.capacity
+        for buffer, values in ((self._x, x), (self._y, y)):
+            buffer[positions] = values
+            buffer[positions + self.capacity] = values
+        overflow = max(self._size + n - self.capacity, 0)
+        self._start = (self._start + overflow) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def arrays(self):
+        end = self._start + self._size
+        return self._x[self._start:end], self._y[self._start:end]
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
+class FileTailer:
+    # Parses only the bytes appended to a CSV since the last read. A partial
+    # last line is held back until its newline arrives, and a file that
+    # shrinks (truncated or rotated) is read again from the start.
+    def __init__(self, file_path, max_bytes=8 * 1024 * 1024):
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.offset = 0
+        self.headers = None
+        self._checked_headers = False
+
+    def read_new(self):
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            self.offset = 0
+            self._checked_headers = False
+        if size == self.offset:
+            return np.empty(0), np.empty(0)
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, self.max_bytes))
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            if len(data) < self.max_bytes:
+                return np.empty(0), np.empty(0)
+            end = len(data)  # A single line longer than max_bytes; parse what there is
+        self.offset += end
+        data = data[:end]
+
+        if not self._checked_headers:
+            self._checked_headers = True
+            first_line, _, rest = data.partition(b'\n')
+            first_row = first_line.decode(errors='replace').strip().split(',')
+            if detect_headers([first_row]):
+                self.headers = first_row
+                data = rest
+        if not data.strip():
+            return np.empty(0), np.empty(0)
+
+        import pandas as pd
+        try:
+            frame = pd.read_csv(io.BytesIO(data), header=None, usecols=[0, 1], skip_blank_lines=True,
+                                on_bad_lines='skip')
+        except (ValueError, pd.errors.ParserError) as e:
+            print(f"Skipping unreadable data in {self.file_path}: {e}")
+            return np.empty(0), np.empty(0)
+        x, y = to_float_columns(frame)
+        valid = np.isfinite(x) & np.isfinite(y)
+        return x[valid], y[valid]
+
+
+class PointReducer:
+    # Keeps a min/max-decimated copy of a series that arrives in chunks,
+    # never holding more than about twice max_points. Each chunk is reduced
+    # on arrival, and the kept points are reduced again whenever they fill up,
+    # so the extremes of every stretch of the data survive in file order.
+    def __init__(self, max_points=REDUCED_POINTS):
+        self.max_points = max_points
+        self._x = []
+        self._y = []
+        self._size = 0
+
+    def add(self, x, y):
+        if len(x) > self.max_points // 4:
+            indices = minmax_indices(y, self.max_points // 8)
+            x, y = x[indices], y[indices]
+        self._x.append(x)
+        self._y.append(y)
+        self._size += len(x)
+        if self._size > 2 * self.max_points:
+            x, y = self.arrays()
+            indices = minmax_indices(y, self.max_points // 2)
+            self._x, self._y, self._size = [x[indices]], [y[indices]], len(indices)
+
+    def arrays(self):
+        if not self._x:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(self._x), np.concatenate(self._y)
+
+
+def fit_csv(file_path, degree, skip_rows=None, progress=None, is_cancelled=None, max_points=REDUCED_POINTS):
+    # Fits a polynomial to the first two columns of a CSV of any size, one
+    # chunk at a time. Returns the reduced points for drawing and the
+    # StreamingPolynomialFit. skip_rows=None skips a header row if there is one.
+    if skip_rows is None:
+        skip_rows = 1 if detect_headers(read_preview(file_path, 1)) else 0
+    fit = StreamingPolynomialFit(degree)
+    reducer = PointReducer(max_points)
+    for chunk in iter_csv_chunks(file_path, skip_rows, progress, is_cancelled):
+        x, y = chunk[:, 0], chunk[:, 1]
+        valid = np.isfinite(x) & np.isfinite(y)
+        x, y = x[valid], y[valid]
+        fit.add(x, y)
+        reducer.add(x, y)
+    return reducer.arrays(), fit
+
+
+class FitFileWorker(ImportWorker):
+    # Runs fit_csv on a worker thread with the same progress and cancel
+    # handling as an import. fitted(points, fit) carries the reduced (x, y)
+    # and the StreamingPolynomialFit.
+    fitted = pyqtSignal(object, object)
+
+    def __init__(self, file_path, degree, parent=None):
+        super().__init__(file_path, parent=parent)
+        self.degree = degree
+
+    def run(self):
+        self._start_time = time.perf_counter()
+        try:
+            points, fit = fit_csv(self.file_path, self.degree, progress=self.report_progress,
+                                  is_cancelled=self.is_cancelled)
+        except ImportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.fitted.emit(points, fit)
@@ -0,0 +1,101 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Fits on fewer points than this are cheap enough to run inline
+BACKGROUND_THRESHOLD = 20_000
+
+# Returned in place of a result that is still being computed
+PENDING = object()
+
+
+class ComputeSignals(QObject):
+    done = pyqtSignal(object, object)
+    error = pyqtSignal(object, str)
+
+
+class ComputeJob(QRunnable):
+    def __init__(self, channel, key, compute):
+        super().__init__()
+        self.channel = channel
+        self.key = key
+        self.compute = compute
+        self.cancelled = False
+        self.finished = False
+        self.signals = ComputeSignals()
+        # The runner may still call tryTake on a job that has already run
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            try:
+                result = self.compute()
+            except Exception as e:
+                failed, result = True, str(e)
+            else:
+                failed = False
+            try:
+                (self.signals.error if failed else self.signals.done).emit(self, result)
+            except RuntimeError:
+                pass  # The application quit while the job was running
+        finally:
+            self.finished = True
+
+
+class ComputeRunner(QObject):
+    # Runs numerical jobs on a thread pool and delivers the results on the GUI
+    # thread. Only the newest job per channel counts: submitting a new one
+    # takes the previous job off the queue if it has not started yet, and a
+    # result from a job that has been superseded is dropped.
+    finished = pyqtSignal(str, object, object)
+    failed = pyqtSignal(str, object, str)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.stale = 0
+        self._latest = {}
+        # Every job until it has run: Python owns the jobs, and one dropped
+        # on cancel would be deleted while a pool thread is still running it
+        self._jobs = []
+
+    def is_pending(self, channel, key):
+        job = self._latest.get(channel)
+        return job is not None and job.key == key
+
+    def submit(self, channel, key, compute):
+        if self.is_pending(channel, key):
+            return
+        self.cancel(channel)
+        job = ComputeJob(channel, key, compute)
+        job.signals.done.connect(self._job_done)
+        job.signals.error.connect(self._job_failed)
+        self._latest[channel] = job
+        self._jobs = [running for running in self._jobs if not running.finished] + [job]
+        self.pool.start(job)
+
+    def cancel(self, channel):
+        job = self._latest.pop(channel, None)
+        if job is not None:
+            job.cancelled = True
+            if self.pool.tryTake(job):
+                job.finished = True
+
+    def cancel_all(self):
+        for channel in list(self._latest):
+            self.cancel(channel)
+
+    def _take_if_latest(self, job):
+        if self._latest.get(job.channel) is not job:
+            self.stale += 1
+            return False
+        del self._latest[job.channel]
+        return True
+
+    def _job_done(self, job, result):
+        if self._take_if_latest(job):
+            self.finished.emit(job.channel, job.key, result)
+
+    def _job_failed(self, job, message):
+        if self._take_if_latest(job):
+            self.failed.emit(job.channel, job.key, message)